@@ -1,5 +1,6 @@
 import requests
 import os
+import argparse
 import time
 import glob
 
@@ -314,11 +315,11 @@ def download_invesco_holdings(ticker: str, download_dir: str, headless: bool = T
     finally:
         driver.quit()
 
-def check_and_download_invesco():
-    """Download all configured Invesco ETFs."""
+def check_and_download_invesco(tickers=None):
+    """Download the configured Invesco ETFs (or just the given tickers)."""
     downloads_performed = 0
     
-    for ticker in INVESCO_TICKERS:
+    for ticker in (INVESCO_TICKERS if tickers is None else tickers):
         print(f"\n--- Checking {ticker} (Invesco) ---")
         filepath = download_invesco_holdings(ticker, INVESCO_DOWNLOAD_DIR, INVESCO_HEADLESS)
         if filepath:
@@ -330,24 +331,36 @@ def check_and_download_invesco():
 # MAIN
 # =============================================================================
 
-def check_and_download_all():
-    """Check and download all configured files."""
-    print("Starting download check for all files...")
+def check_and_download_all(sources=None):
+    """Check and download all configured files, or only the given sources (e.g. ["PRIV", "GTO"])."""
+    if sources is None:
+        print("Starting download check for all files...")
+        ssga_names = list(URLS)
+        invesco_tickers = INVESCO_TICKERS
+    else:
+        selected = {source.upper() for source in sources}
+        print(f"Starting download check for: {', '.join(sorted(selected))}")
+        ssga_names = [name for name in URLS if name.upper() in selected]
+        invesco_tickers = [ticker for ticker in INVESCO_TICKERS if ticker in selected]
     
     # Download SSGA files
     ssga_downloads = 0
-    for name, config in URLS.items():
-        if check_and_download_single(name, config):
+    for name in ssga_names:
+        if check_and_download_single(name, URLS[name]):
             ssga_downloads += 1
     
-    # Download Invesco files
-    invesco_downloads = check_and_download_invesco()
+    # Download Invesco files (skipped entirely, browser and all, when none are selected)
+    invesco_downloads = check_and_download_invesco(invesco_tickers) if invesco_tickers else 0
     
     print(f"\n--- Summary ---")
-    print(f"SSGA files checked: {len(URLS)}")
+    print(f"SSGA files checked: {len(ssga_names)}")
     print(f"SSGA files downloaded: {ssga_downloads}")
-    print(f"Invesco files checked: {len(INVESCO_TICKERS)}")
+    print(f"Invesco files checked: {len(invesco_tickers)}")
     print(f"Invesco files downloaded: {invesco_downloads}")
 
 if __name__ == "__main__":
-    check_and_download_all()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Download the latest SSGA and Invesco holdings files")
+    parser.add_argument("sources", nargs="*", metavar="SOURCE",
+                        help="Only download these sources (e.g. PRIV GTO). Omit to download all.")
+    args = parser.parse_args()
+    check_and_download_all(args.sources or None)
\ No newline at end of file
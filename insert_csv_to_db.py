@@ -58,53 +58,84 @@ def insert_csv_to_db(csv_file, db_file, table_name="financial_data", check_dupli
     # Connect to database
     print(f"\n🔗 Connecting to database: {db_file}")
     conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
     
-    # Check for duplicates if requested and date column exists
-    rows_to_insert = len(df)
-    if check_duplicates and 'date' in df.columns:
+    # Tune the connection for bulk writes (WAL + NORMAL sync, 64 MB cache, in-memory temp
+    # storage, 256 MB mmap); skip any pragma that can't be applied, e.g. while the DB is locked
+    for pragma in ("journal_mode=WAL", "synchronous=NORMAL", "cache_size=-65536",
+                   "temp_store=MEMORY", "mmap_size=268435456"):
         try:
-            # Get existing dates from database
-            existing_dates = cursor.execute(f"SELECT DISTINCT date FROM {table_name}").fetchall()
-            existing_dates = set(date[0] for date in existing_dates)
-            print(f"📅 Found {len(existing_dates)} existing dates in database")
-            
-            # Get dates from CSV
-            csv_dates = df["date"].dropna().unique()
-            print(f"📅 Found {len(csv_dates)} unique dates in CSV")
-            
-            # Filter out rows with existing dates
-            initial_rows = len(df)
-            df = df[~df["date"].isin(existing_dates)]
-            filtered_rows = len(df)
-            rows_to_insert = filtered_rows
-            
-            if initial_rows > filtered_rows:
-                print(f"⚠️  Filtered out {initial_rows - filtered_rows} rows with duplicate dates")
-            
-            if df.empty:
-                print("ℹ️  All dates in this CSV already exist in the database. No new data to insert.")
-                conn.close()
-                return True
-                
+            conn.execute(f"PRAGMA {pragma}")
         except sqlite3.OperationalError as e:
-            if "no such table" in str(e):
-                print(f"📝 Table '{table_name}' doesn't exist yet. All data will be inserted as new.")
-            else:
-                print(f"❌ Database error: {str(e)}")
-                conn.close()
-                return False
-    elif check_duplicates and 'date' not in df.columns:
+            print(f"⚠️  Could not apply PRAGMA {pragma}: {str(e)}")
+    cursor = conn.cursor()
+    
+    # Check whether the target table exists yet (and, when skipping existing dates, index
+    # the date column so each NOT EXISTS probe is a lookup, not a table scan)
+    try:
+        table_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone() is not None
+        if check_duplicates and 'date' in df.columns and table_exists:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_date" ON "{table_name}" (date)')
+    except sqlite3.OperationalError as e:
+        print(f"❌ Database error: {str(e)}")
+        conn.close()
+        return False
+    
+    if check_duplicates and 'date' in df.columns and table_exists:
+        # Let SQLite skip existing dates: stage the CSV, then anti-join it against the table
+        stage_table = f"_stage_{table_name}"
+        column_list = ", ".join(f'"{col}"' for col in df.columns)
+        not_exists = f'NOT EXISTS (SELECT 1 FROM "{table_name}" f WHERE f.date = s.date)'
+        
+        csv_dates = df["date"].dropna().unique()
+        print(f"📅 Found {len(csv_dates)} unique dates in CSV")
+        
+        try:
+            df.to_sql(stage_table, conn, if_exists="replace", index=False)
+            print(f"\n💾 Inserting rows with new dates into table '{table_name}'...")
+            with conn:
+                cursor.execute(
+                    f'INSERT INTO "{table_name}" ({column_list}) '
+                    f'SELECT {column_list} FROM "{stage_table}" s WHERE {not_exists}'
+                )
+                rows_inserted = cursor.rowcount
+            cursor.execute(f'DROP TABLE IF EXISTS "{stage_table}"')
+            conn.close()
+        except Exception as e:
+            print(f"❌ Error inserting data into database: {str(e)}")
+            conn.rollback()
+            try:
+                conn.execute(f'DROP TABLE IF EXISTS "{stage_table}"')
+            except sqlite3.Error:
+                pass  # e.g. still locked; the stage table is replaced on the next run
+            conn.close()
+            return False
+        
+        if len(df) > rows_inserted:
+            print(f"⚠️  Filtered out {len(df) - rows_inserted} rows with duplicate dates")
+        
+        if rows_inserted == 0:
+            print("ℹ️  All dates in this CSV already exist in the database. No new data to insert.")
+        else:
+            print(f"✅ Successfully inserted {rows_inserted} rows into the database!")
+        return True
+    
+    if check_duplicates and 'date' not in df.columns:
         print("⚠️  Warning: No 'date' column found. Cannot check for duplicates.")
+    elif check_duplicates:
+        print(f"📝 Table '{table_name}' doesn't exist yet. All data will be inserted as new.")
     
     # Insert data into database
     try:
-        print(f"\n💾 Inserting {rows_to_insert} rows into table '{table_name}'...")
+        print(f"\n💾 Inserting {len(df)} rows into table '{table_name}'...")
         df.to_sql(table_name, conn, if_exists="append", index=False)
+        if 'date' in df.columns:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table_name}_date" ON "{table_name}" (date)')
         conn.commit()
         conn.close()
         
-        print(f"✅ Successfully inserted {rows_to_insert} rows into the database!")
+        print(f"✅ Successfully inserted {len(df)} rows into the database!")
         return True
         
     except Exception as e:
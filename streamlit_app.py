@@ -1,35 +1,226 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import sqlite3
 import altair as alt
 from datetime import datetime
 import io
+import os
 
 st.set_page_config(layout="wide")
 st.title("📊 Financial Holdings: Multi-Fund Dashboard")
 
+DB_PATH = "priv_data.db"
+SNAPSHOT_PATH = os.path.join("output", ".cache", "dashboard_snapshot.parquet")
+SNAPSHOT_FUNDS = ("PRIV", "PRSD", "GTO", "GTOC")
+
+# === Database Connection ===
+@st.cache_resource
+def get_conn():
+    # Read-only connection shared across reruns and sessions
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro&cache=shared", uri=True, check_same_thread=False)
+    # Serve reads from memory-mapped pages; journal_mode/page_size are file-level settings
+    # owned by the writer (sync_csv_to_db.py) and cannot be changed on a read-only handle
+    conn.execute("PRAGMA mmap_size=1073741824")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def db_stamp():
+    """(mtime_ns, size) of the DB and its WAL; changes on every committed write, checkpointed or not"""
+    stamp = []
+    for path in (DB_PATH, DB_PATH + "-wal"):
+        try:
+            info = os.stat(path)
+        except OSError:
+            info = None
+        # Opening a reader creates an empty -wal, so an empty WAL counts the same as none
+        if info is None or (path != DB_PATH and info.st_size == 0):
+            stamp.append(None)
+        else:
+            stamp.append([info.st_mtime_ns, info.st_size])
+    return tuple(stamp)
+
+
+def snapshot_source(stamp):
+    """What a snapshot was built from, in the JSON-safe form DataFrame.attrs round-trips through Parquet"""
+    return {"db": os.path.abspath(DB_PATH), "db_stamp": list(stamp), "funds": list(SNAPSHOT_FUNDS)}
+
+
+def read_snapshot(stamp):
+    """The Parquet snapshot if it was built from this DB, DB state and fund list, else None"""
+    try:
+        df = pd.read_parquet(SNAPSHOT_PATH, engine="pyarrow", memory_map=True)
+    except Exception:
+        return None
+    if df.attrs.pop("source", None) != snapshot_source(stamp):
+        return None
+    return df
+
+
+@st.cache_resource
+def get_frame(stamp):
+    """Load every dashboard fund once, via a Parquet snapshot rebuilt when the DB changes"""
+    df = read_snapshot(stamp)
+    if df is not None:
+        return df
+
+    placeholders = ",".join("?" * len(SNAPSHOT_FUNDS))
+    df = pd.read_sql(
+        f"SELECT * FROM financial_data WHERE source_identifier IN ({placeholders})",
+        get_conn(),
+        params=SNAPSHOT_FUNDS
+    )
+    if df["date"].dtype.kind != "M":
+        # Dates are stored as M/D/YYYY text; an explicit format skips per-row inference
+        df["date"] = pd.to_datetime(df["date"], format="%m/%d/%Y", cache=True)
+    # Ensure numeric columns are properly typed (handles string values from DB)
+    df["market_value"] = pd.to_numeric(df["market_value"], errors="coerce")
+    df["par_value"] = pd.to_numeric(df["par_value"], errors="coerce")
+
+    # Repeated string keys become integer-coded categoricals; money columns stay float64
+    for col in ("name", "identifier", "asset_breakdown", "source_identifier"):
+        df[col] = df[col].astype("category")
+
+    df.attrs["source"] = snapshot_source(stamp)
+    try:
+        os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+        df.to_parquet(SNAPSHOT_PATH, engine="pyarrow", compression="zstd", index=False)
+    except Exception:
+        # Snapshot is only an accelerator; serve straight from SQLite if it can't be written
+        df.attrs.pop("source")
+        return df
+    snapshot = read_snapshot(stamp)
+    return df if snapshot is None else snapshot
+
+
 # === Load Data Function ===
-@st.cache_data
+@st.cache_data(ttl=3600, show_spinner=False)
 def load_data(fund_symbol):
-    conn = sqlite3.connect("priv_data.db")
-
     try:
-        # Filter by source_identifier column (using parameterized query to prevent SQL injection)
-        df = pd.read_sql(
-            "SELECT * FROM financial_data WHERE source_identifier = ?",
-            conn,
-            params=(fund_symbol,)
-        )
-        df["date"] = pd.to_datetime(df["date"])
-        # Ensure numeric columns are properly typed (handles string values from DB)
-        df["market_value"] = pd.to_numeric(df["market_value"], errors="coerce")
-        df["par_value"] = pd.to_numeric(df["par_value"], errors="coerce")
+        df = get_frame(db_stamp())
+        df = df[df["source_identifier"] == fund_symbol].reset_index(drop=True)
+        # Drop categories that only occur in other funds
+        for col in df.select_dtypes("category").columns:
+            df[col] = df[col].cat.remove_unused_categories()
         return df
     except Exception as e:
         st.error(f"Error loading data for {fund_symbol}: {str(e)}")
         return pd.DataFrame()
-    finally:
-        conn.close()
+
+
+# Dates stay datetime64 in every frame; the browser formats them for display
+DISPLAY_DATE_COLUMN = {"date": st.column_config.DateColumn("date", format="MM/DD/YYYY")}
+
+
+def df_to_csv_bytes(df):
+    """Encode a DataFrame as CSV bytes for st.download_button"""
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, chunksize=50_000, date_format="%Y-%m-%d")
+    return buf.getvalue()
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def cached_csv_bytes(cache_key, _df):
+    """df_to_csv_bytes memoized on cache_key; _df is not hashed, so the key must identify its contents"""
+    return df_to_csv_bytes(_df)
+
+
+def sorted_group_change(df, key, col, pct=False):
+    """Per-group diff (or fractional pct change) of col for a frame already sorted by [key, date]"""
+    if df.empty:
+        return np.empty(0)
+    keys = df[key].to_numpy()
+    values = df[col].to_numpy(dtype=np.float64)
+    same_group = np.r_[False, keys[1:] == keys[:-1]]
+    prev_values = np.r_[np.nan, values[:-1]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = values / prev_values - 1 if pct else values - prev_values
+    return np.where(same_group, change, np.nan)
+
+
+def sorted_trading_days(df):
+    """Distinct dates in df as an ascending datetime64[D] array"""
+    return np.unique(df["date"].to_numpy().astype("M8[D]"))
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_data_by_date(fund_symbol):
+    """Group a fund's holdings by calendar date so per-date lookups are O(1)"""
+    df = load_data(fund_symbol)
+    if df.empty:
+        return {}
+    return {d.date(): g for d, g in df.groupby(df["date"].dt.normalize(), sort=False)}
+
+
+# === Chart Templates ===
+# Encodings are built once per process; renders attach their data with .properties(data=...)
+@st.cache_resource
+def asset_breakdown_bar_template():
+    return alt.Chart().mark_bar().encode(
+        x=alt.X("asset_breakdown", sort="-y", title="Asset Type"),
+        y=alt.Y("percentage", title="Market %"),
+        tooltip=["asset_breakdown", "percentage"]
+    ).properties(height=400)
+
+
+@st.cache_resource
+def aos_pie_template():
+    return alt.Chart().mark_arc(innerRadius=50).encode(
+        theta=alt.Theta("market_value:Q", title="Market Value"),
+        color=alt.Color("clean_name:N", title="Asset"),
+        tooltip=["clean_name:N", "market_value:Q", "percentage:Q"]
+    ).properties(height=400)
+
+
+@st.cache_resource
+def weekly_par_bar_template():
+    return alt.Chart().mark_bar().encode(
+        x=alt.X("week:N", title="Week", sort=alt.EncodingSortField(field="week_end", op="min"),
+                axis=alt.Axis(labelAngle=0)),
+        y=alt.Y("par_value:Q", title="Average Par Value"),
+        color=alt.Color("clean_name:N", title="Asset"),
+        tooltip=["week:N", "clean_name:N", "par_value:Q"]
+    ).properties(height=400)
+
+
+@st.cache_resource
+def daily_pct_line_template(color_scheme, dashed=False):
+    base = alt.Chart().mark_line(strokeDash=[5,5], opacity=0.7, strokeWidth=2) if dashed else alt.Chart().mark_line(strokeWidth=2)
+    return base.encode(
+        x=alt.X("date:T", 
+                title="Date",
+                axis=alt.Axis(
+                    labelAngle=-45, 
+                    format="%m/%d/%y",
+                    labelOverlap=False,
+                    tickCount=10
+                )),
+        y=alt.Y("Percentage_Change:Q", 
+                title="Daily % Change", 
+                scale=alt.Scale(zero=False)),
+        color=alt.Color("Asset:N", title="Asset", scale=alt.Scale(scheme=color_scheme)),
+        tooltip=["date:T", "Asset:N", alt.Tooltip("Percentage_Change:Q", format=".2f", title="% Change")]
+    )
+
+
+@st.cache_resource
+def last_5_line_template():
+    return alt.Chart().mark_line(point=True).encode(
+        x=alt.X("date:T", title="Date"),
+        y=alt.Y("price_pct_change:Q", title="Daily % Change", scale=alt.Scale(zero=False)),
+        color=alt.Color("clean_name:N", title="Asset"),
+        tooltip=["date:T", "clean_name:N", alt.Tooltip("price_pct_change:Q", format=".2f", title="% Change")]
+    ).properties(height=400)
+
+
+@st.cache_resource
+def zero_line_template():
+    # Horizontal line at 0%
+    return alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(color='gray', strokeDash=[2,2], opacity=0.5).encode(
+        y=alt.Y('y:Q')
+    )
 
 
 # === Date Filter Section on Main Page ===
@@ -39,8 +230,8 @@ st.markdown("---")
 df_priv_dates = load_data("PRIV")
 df_prsd_dates = load_data("PRSD")
 
-available_dates_priv = sorted(df_priv_dates["date"].dt.date.unique(), reverse=True) if not df_priv_dates.empty else []
-available_dates_prsd = sorted(df_prsd_dates["date"].dt.date.unique(), reverse=True) if not df_prsd_dates.empty else []
+available_dates_priv = list(sorted_trading_days(df_priv_dates)[::-1].astype(object)) if not df_priv_dates.empty else []
+available_dates_prsd = list(sorted_trading_days(df_prsd_dates)[::-1].astype(object)) if not df_prsd_dates.empty else []
 
 col_date_priv, col_date_prsd = st.columns(2)
 
@@ -128,12 +319,7 @@ if not export_df.empty:
     # Direct download button
     st.sidebar.markdown("---")
     if bulk_data is not None and not bulk_data.empty:
-        # Format date for export
-        bulk_data["date"] = bulk_data["date"].dt.strftime("%Y-%m-%d")
-        
-        csv_buffer = io.StringIO()
-        bulk_data.to_csv(csv_buffer, index=False)
-        csv_data = csv_buffer.getvalue()
+        csv_data = df_to_csv_bytes(bulk_data)
         
         st.sidebar.download_button(
             label=f"📥 Download {export_fund_selection} Export",
@@ -148,58 +334,284 @@ if not export_df.empty:
 # === Create Tabs ===
 tab1, tab2, tab3 = st.tabs(["📈 PRIV", "📊 PRSD", "AP Grange Pricing"])
 
-# === Function to render dashboard for a specific fund ===
-def render_fund_dashboard(fund_symbol, df, selected_date):
-    if df.empty:
-        st.warning(f"No data available for {fund_symbol}")
-        return
-    
-    fund_info = FUND_CONFIG[fund_symbol]
-    st.markdown(f"### {fund_info['name']} ({fund_symbol})")
-    
-    # Get all available dates
-    available_dates = sorted(df["date"].dt.date.unique(), reverse=True)
+# === Fund Dashboard Computation ===
+# Pure pandas/NumPy work is cached per (fund, date) so reruns only replay the draw calls below
+def create_clean_name(asset_name):
+    """Create cleaner asset names using first 5 words"""
+    words = asset_name.split()
+    # Take first 5 words, or all words if fewer than 5
+    clean_name = " ".join(words[:5])
+    return clean_name
+
+
+def create_composite_key(df):
+    df = df.copy()
+    df['composite_key'] = df.apply(lambda row: row['name'] if row['identifier'] == '-' else row['identifier'], axis=1)
+    return df.set_index('composite_key')
+
+
+def build_aos_frame(df):
+    """AOS Corporate Finance rows sorted by [name, date] with price and daily changes"""
+    aos_df = df[df["asset_breakdown"] == "AOS Corporate Finance"].copy()
+    aos_df.sort_values(["name", "date"], inplace=True)
+
+    # Calculate Price = Market Value / Par Value
+    aos_df["price"] = aos_df["market_value"] / aos_df["par_value"] * 100
+
+    # Daily Price % Change and Market Value Change
+    aos_df["price_pct_change"] = sorted_group_change(aos_df, "name", "price", pct=True) * 100
+    aos_df["market_value_change"] = sorted_group_change(aos_df, "name", "market_value")
+    return aos_df
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def compute_fund_payload(fund_symbol, selected_date):
+    """Reduce a fund's history to the small frames render_fund_dashboard draws for one date"""
+    df = load_data(fund_symbol)
+
+    # Get all available dates (ascending datetime64[D])
+    trading_days = sorted_trading_days(df)
     
     # Get previous available date
-    if selected_date and selected_date in available_dates:
-        current_idx = available_dates.index(selected_date)
-        previous_date = available_dates[current_idx + 1] if current_idx + 1 < len(available_dates) else None
-    else:
-        previous_date = None
+    previous_date = None
+    if selected_date:
+        current_idx = np.searchsorted(trading_days, np.datetime64(selected_date, "D"))
+        if 0 < current_idx < len(trading_days) and trading_days[current_idx] == np.datetime64(selected_date, "D"):
+            previous_date = trading_days[current_idx - 1].astype(object)
 
     # === Filter Data by Date (no asset type filtering) ===
-    df_current = df[df["date"].dt.date == selected_date] if selected_date else pd.DataFrame()
-    df_previous = df[df["date"].dt.date == previous_date] if previous_date else pd.DataFrame(columns=df.columns)
+    by_date = load_data_by_date(fund_symbol)
+    empty_df = df.iloc[0:0]
+    df_current = by_date.get(selected_date, empty_df) if selected_date else empty_df
+    df_previous = by_date.get(previous_date, empty_df) if previous_date else empty_df
 
     # === Index for Comparison ===
-    def create_composite_key(df):
-        df = df.copy()
-        df['composite_key'] = df.apply(lambda row: row['name'] if row['identifier'] == '-' else row['identifier'], axis=1)
-        return df.set_index('composite_key')
-
     df_current_indexed = create_composite_key(df_current)
     df_previous_indexed = create_composite_key(df_previous)
 
-    # === Asset Comparison ===
-    new_assets = df_current_indexed[~df_current_indexed.index.isin(df_previous_indexed.index)]
-    removed_assets = df_previous_indexed[~df_previous_indexed.index.isin(df_current_indexed.index)]
+    # === Asset Comparison (on integer codes of the composite keys) ===
+    all_keys = df_current_indexed.index.append(df_previous_indexed.index).unique()
+    current_codes = all_keys.get_indexer(df_current_indexed.index)
+    previous_codes = all_keys.get_indexer(df_previous_indexed.index)
+    in_previous = np.isin(current_codes, previous_codes)
+    in_current = np.isin(previous_codes, current_codes)
+
+    asset_cols = ["name", "par_value", "market_value", "asset_breakdown"]
+    new_assets = df_current_indexed[~in_previous].reset_index()[asset_cols]
+    removed_assets = df_previous_indexed[~in_current].reset_index()[asset_cols]
 
     # Compare common assets for par value changes
-    common_assets = df_current_indexed[df_current_indexed.index.isin(df_previous_indexed.index)].copy()
+    common_assets = df_current_indexed[in_previous].copy()
     if not df_previous_indexed.empty and not common_assets.empty:
         common_assets["par_value_prev"] = df_previous_indexed["par_value"]
         common_assets["par_change"] = common_assets["par_value"] - common_assets["par_value_prev"]
-        par_changes = common_assets[common_assets["par_change"] != 0]
+        par_changes = common_assets[common_assets["par_change"] != 0].reset_index()[
+            ["name", "par_value_prev", "par_value", "par_change", "asset_breakdown"]
+        ]
     else:
         par_changes = pd.DataFrame()
 
+    payload = {
+        "previous_date": previous_date,
+        "total_market_value": df_current["market_value"].sum(),
+        "total_par_value": df_current["par_value"].sum(),
+        "securities_count": len(df_current),
+        "new_assets": new_assets,
+        "removed_assets": removed_assets,
+        "par_changes": par_changes,
+        "breakdown_chart": None,
+        "has_aos": False,
+        "aos_current": None,
+    }
+
+    # === Market Value Breakdown by Asset Type ===
+    if not df_current.empty:
+        df_chart = df_current.groupby("asset_breakdown", observed=True)["market_value"].sum().reset_index()
+        df_chart["percentage"] = df_chart["market_value"] / df_chart["market_value"].sum() * 100
+        payload["breakdown_chart"] = df_chart
+
+    # === AOS Corporate Finance Section ===
+    aos_df = build_aos_frame(df)
+    payload["has_aos"] = not aos_df.empty
+    if aos_df.empty:
+        return payload
+
+    # Filter to show only the selected current date
+    aos_current_date = aos_df[aos_df.index.isin(df_current.index)].copy()
+    if aos_current_date.empty:
+        return payload
+
+    aos_cols = ["date", "name", "market_value", "par_value", "price", "price_pct_change", "market_value_change"]
+    payload["aos_current"] = aos_current_date[aos_cols]
+
+    # Create pie chart data for AOS Corporate Finance assets
+    aos_pie_data = aos_current_date.copy()
+    aos_pie_data["percentage"] = aos_pie_data["market_value"] / aos_pie_data["market_value"].sum() * 100
+    aos_pie_data["clean_name"] = aos_pie_data["name"].apply(create_clean_name)
+    payload["aos_pie"] = aos_pie_data
+
+    # Get all available dates and organize into weeks (every 5 business days, newest first)
+    week_size = 5  # 5 business days per week
+    num_weeks = min(12, len(trading_days) // week_size)  # Show up to 12 weeks
+    window_days = trading_days[len(trading_days) - num_weeks * week_size:]
+    week_ends = pd.to_datetime(window_days[::-1][::week_size])
+    week_labels = week_ends.strftime("%m/%d/%y")
+
+    # Map each AOS row to its week in a single pass
+    aos_days = aos_df["date"].to_numpy().astype("M8[D]")
+    pos = np.searchsorted(window_days, aos_days)
+    in_window = pos < len(window_days)
+    in_window[in_window] = window_days[pos[in_window]] == aos_days[in_window]
+
+    payload["weekly_summary"] = None
+    if in_window.any():
+        week_idx = (len(window_days) - 1 - pos[in_window]) // week_size
+        combined_weekly_df = pd.DataFrame({
+            "week": week_labels[week_idx],
+            "week_end": week_ends[week_idx],
+            "name": aos_df["name"].to_numpy()[in_window],
+            "par_value": aos_df["par_value"].to_numpy()[in_window]
+        })
+
+        # Apply clean name function to all AOS assets
+        combined_weekly_df["clean_name"] = combined_weekly_df["name"].apply(create_clean_name)
+
+        # Aggregate par values by week and asset, keeping week_end for proper sorting
+        weekly_summary = combined_weekly_df.groupby(["week", "week_end", "clean_name"])["par_value"].mean().reset_index()
+
+        # Sort by week_end date to ensure chronological order
+        payload["weekly_summary"] = weekly_summary.sort_values("week_end", ascending=True)
+
+    # Get the first of the last 5 business days from available dates
+    last_5_start = pd.Timestamp(trading_days[max(len(trading_days) - 5, 0)])
+
+    # Prepare data for last 5 days with percentage changes
+    last_5_base_df = aos_df.copy()
+    last_5_base_df["clean_name"] = last_5_base_df["name"].apply(create_clean_name)
+
+    # Sort and calculate percentage changes for the last 5 days data
+    last_5_sorted_df = last_5_base_df.sort_values(["clean_name", "date"]).copy()
+    last_5_sorted_df["price_pct_change"] = sorted_group_change(last_5_sorted_df, "clean_name", "price", pct=True) * 100
+
+    # Filter for last 5 business days
+    last_5_df = last_5_sorted_df[last_5_sorted_df["date"] >= last_5_start]
+    payload["last_5"] = last_5_df[["date", "clean_name", "price", "price_pct_change", "market_value", "par_value"]]
+
+    return payload
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def compute_aos_index_payload(fund_symbol, num_days=None):
+    """Market-value-weighted AOS index and per-asset % changes over the last num_days trading days"""
+    # Use all AOS Corporate Finance assets
+    index_df = build_aos_frame(load_data(fund_symbol))
+    trading_days = None
+
+    # Filter by selected date range
+    if num_days is not None:
+        # Get the last N trading days
+        selected_trading_days = sorted_trading_days(index_df)[-num_days:]
+        
+        # Filter the dataframe to only include these dates
+        index_df = index_df[index_df["date"] >= pd.Timestamp(selected_trading_days[0])].copy()
+        trading_days = (len(selected_trading_days), selected_trading_days[0].astype(object), selected_trading_days[-1].astype(object))
+
+    # Add clean names for individual asset tracking
+    index_df["clean_name"] = index_df["name"].apply(create_clean_name)
+
+    # Calculate market-value-weighted index in one pass over dense date codes
+    date_codes, index_dates = pd.factorize(index_df["date"], sort=True)
+    weights = index_df["market_value"].to_numpy(dtype=np.float64)
+    price_weighted = index_df["price"].to_numpy(dtype=np.float64) * weights
+    total_mv = np.bincount(date_codes, weights=np.where(np.isnan(weights), 0.0, weights))
+    weighted_price = np.bincount(date_codes, weights=np.where(np.isnan(price_weighted), 0.0, price_weighted))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        index_daily_sorted = pd.DataFrame({
+            "date": index_dates,
+            "Weighted Index": weighted_price / total_mv
+        })
+
+    # Calculate percentage changes (dates are already sorted)
+    index_daily_sorted["Weighted Index % Change"] = index_daily_sorted["Weighted Index"].pct_change() * 100
+
+    # Calculate moving averages for the percentage changes
+    index_daily_sorted["MA_30"] = index_daily_sorted["Weighted Index % Change"].rolling(window=30, min_periods=1).mean()
+    index_daily_sorted["MA_60"] = index_daily_sorted["Weighted Index % Change"].rolling(window=60, min_periods=1).mean()
+    index_daily_sorted["MA_200"] = index_daily_sorted["Weighted Index % Change"].rolling(window=200, min_periods=1).mean()
+
+    # Prepare individual asset percentage changes for charting
+    individual_pct_changes = index_df.sort_values(["clean_name", "date"]).copy()
+    individual_pct_changes["price_pct_change"] = sorted_group_change(individual_pct_changes, "clean_name", "price", pct=True) * 100
+
+    # Pivot individual asset percentage changes (first row wins if two assets share a clean name)
+    individual_pct_pivot = (
+        individual_pct_changes.drop_duplicates(["date", "clean_name"])
+        .set_index(["date", "clean_name"])["price_pct_change"]
+        .unstack("clean_name")
+        .reset_index()
+    )
+
+    # Combine weighted index percentage changes with individual asset percentage changes
+    chart_data = individual_pct_pivot.merge(
+        index_daily_sorted[["date", "Weighted Index % Change", "MA_30", "MA_60", "MA_200"]], 
+        on="date", 
+        how="left"
+    )
+
+    # Rename moving averages for better display
+    chart_data = chart_data.rename(columns={
+        "Weighted Index % Change": "Weighted Index",
+        "MA_30": "30-Day MA",
+        "MA_60": "60-Day MA", 
+        "MA_200": "200-Day MA"
+    })
+
+    # Melt the data for charting
+    chart_data_melted = chart_data.melt(
+        id_vars=["date"], 
+        var_name="Asset", 
+        value_name="Percentage_Change"
+    )
+
+    # Remove NaN values for cleaner chart
+    chart_data_melted = chart_data_melted.dropna(subset=["Percentage_Change"])
+
+    # Create separate datasets for main lines and moving averages
+    is_ma = chart_data_melted['Asset'].isin(['30-Day MA', '60-Day MA', '200-Day MA'])
+
+    return {
+        "trading_days": trading_days,
+        "index_daily": index_daily_sorted[["date", "Weighted Index", "Weighted Index % Change", "MA_30", "MA_60", "MA_200"]],
+        "main_data": chart_data_melted[~is_ma],
+        "ma_data": chart_data_melted[is_ma],
+    }
+
+
+# === Function to render dashboard for a specific fund ===
+# Each dashboard is a fragment: its own widgets rerun only that tab, not the whole app
+@st.fragment
+def render_fund_dashboard(fund_symbol, df, selected_date):
+    if df.empty:
+        st.warning(f"No data available for {fund_symbol}")
+        return
+    
+    fund_info = FUND_CONFIG[fund_symbol]
+    st.markdown(f"### {fund_info['name']} ({fund_symbol})")
+
+    payload = compute_fund_payload(fund_symbol, selected_date)
+    previous_date = payload["previous_date"]
+    new_assets = payload["new_assets"]
+    removed_assets = payload["removed_assets"]
+    par_changes = payload["par_changes"]
+
     # === Layout ===
     st.subheader(f"📅 {fund_symbol} Comparing: {selected_date} vs {previous_date if previous_date else '—'}")
 
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Market Value", f"${df_current['market_value'].sum():,.2f}")
-    col2.metric("Total Par Value", f"${df_current['par_value'].sum():,.2f}")
-    col3.metric("Securities Count", len(df_current))
+    col1.metric("Total Market Value", f"${payload['total_market_value']:,.2f}")
+    col2.metric("Total Par Value", f"${payload['total_par_value']:,.2f}")
+    col3.metric("Securities Count", payload["securities_count"])
 
     # === Export Current View Section ===
     st.markdown("---")
@@ -209,10 +621,7 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
 
     with col_export1:
         if not new_assets.empty:
-            export_new = new_assets.reset_index()[["name", "par_value", "market_value", "asset_breakdown"]]
-            csv_buffer = io.StringIO()
-            export_new.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, selected_date, "new_assets"), new_assets)
             st.download_button(
                 label="📥 New Assets",
                 data=csv_data,
@@ -225,10 +634,7 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
 
     with col_export2:
         if not removed_assets.empty:
-            export_removed = removed_assets.reset_index()[["name", "par_value", "market_value", "asset_breakdown"]]
-            csv_buffer = io.StringIO()
-            export_removed.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, selected_date, "removed_assets"), removed_assets)
             st.download_button(
                 label="📥 Removed Assets",
                 data=csv_data,
@@ -241,10 +647,7 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
 
     with col_export3:
         if not par_changes.empty:
-            export_changes = par_changes.reset_index()[["name", "par_value_prev", "par_value", "par_change", "asset_breakdown"]]
-            csv_buffer = io.StringIO()
-            export_changes.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, selected_date, "par_changes"), par_changes)
             st.download_button(
                 label="📥 Par Changes",
                 data=csv_data,
@@ -261,19 +664,19 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
 
     st.markdown("### ➕ New Assets")
     if not new_assets.empty:
-        st.dataframe(new_assets.reset_index()[["name", "par_value", "market_value", "asset_breakdown"]], use_container_width=True, hide_index=True)
+        st.dataframe(new_assets, use_container_width=True, hide_index=True)
     else:
         st.info("No new assets")
 
     st.markdown("### ➖ Removed Assets")
     if not removed_assets.empty:
-        st.dataframe(removed_assets.reset_index()[["name", "par_value", "market_value", "asset_breakdown"]], use_container_width=True, hide_index=True)
+        st.dataframe(removed_assets, use_container_width=True, hide_index=True)
     else:
         st.info("No removed assets")
 
     st.markdown("### 🔁 Par Value Changes")
     if not par_changes.empty:
-        st.dataframe(par_changes.reset_index()[["name", "par_value_prev", "par_value", "par_change", "asset_breakdown"]], use_container_width=True, hide_index=True)
+        st.dataframe(par_changes, use_container_width=True, hide_index=True)
     else:
         st.info("No par value changes")
 
@@ -281,15 +684,8 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
     st.markdown("---")
     st.subheader(f"📊 {fund_symbol} Market Value Breakdown by Asset Type")
 
-    if not df_current.empty:
-        df_chart = df_current.groupby("asset_breakdown")["market_value"].sum().reset_index()
-        df_chart["percentage"] = df_chart["market_value"] / df_chart["market_value"].sum() * 100
-
-        bar_chart = alt.Chart(df_chart).mark_bar().encode(
-            x=alt.X("asset_breakdown", sort="-y", title="Asset Type"),
-            y=alt.Y("percentage", title="Market %"),
-            tooltip=["asset_breakdown", "percentage"]
-        ).properties(height=400)
+    if payload["breakdown_chart"] is not None:
+        bar_chart = asset_breakdown_bar_template().properties(data=payload["breakdown_chart"])
 
         st.altair_chart(bar_chart, use_container_width=True)
     else:
@@ -299,47 +695,19 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
     st.markdown("---")
     st.subheader(f"🏦 {fund_symbol} AOS Corporate Finance Analysis")
 
-    # Filter to AOS assets only
-    aos_df = df[df["asset_breakdown"] == "AOS Corporate Finance"].copy()
-    
-    if not aos_df.empty:
-        aos_df["date"] = pd.to_datetime(aos_df["date"])
-        aos_df.sort_values(["name", "date"], inplace=True)
-
-        # Calculate Price = Market Value / Par Value
-        aos_df["price"] = aos_df["market_value"] / aos_df["par_value"] * 100
-
-        # Daily Price % Change and Market Value Change
-        aos_df["price_pct_change"] = aos_df.groupby("name")["price"].pct_change() * 100
-        aos_df["market_value_change"] = aos_df.groupby("name")["market_value"].diff()
-
+    if payload["has_aos"]:
         st.markdown("### 📋 Asset-Level Price and Value Movements")
 
-        # Filter to show only the selected current date
-        aos_current_date = aos_df[aos_df["date"].dt.date == selected_date].copy()
-
-        if not aos_current_date.empty:
-            # Format the date column
-            aos_current_date_display = aos_current_date.copy()
-            aos_current_date_display["date_formatted"] = aos_current_date_display["date"].dt.strftime("%m/%d/%Y")
-
+        if payload["aos_current"] is not None:
             st.dataframe(
-                aos_current_date_display[
-                    ["date_formatted", "name", "market_value", "par_value", "price", "price_pct_change", "market_value_change"]
-                ].rename(columns={"date_formatted": "date"}),
+                payload["aos_current"],
                 use_container_width=True,
-                hide_index=True
+                hide_index=True,
+                column_config=DISPLAY_DATE_COLUMN
             )
 
             # Export button for AOS current data
-            aos_export = aos_current_date[
-                ["date", "name", "market_value", "par_value", "price", "price_pct_change", "market_value_change"]
-            ].copy()
-            aos_export["date"] = aos_export["date"].dt.strftime("%Y-%m-%d")
-            
-            csv_buffer = io.StringIO()
-            aos_export.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, selected_date, "aos_current"), payload["aos_current"])
             
             st.download_button(
                 label=f"📥 Download {fund_symbol} AOS Current Data",
@@ -352,71 +720,17 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
             # === AOS Corporate Finance Pie Chart ===
             st.markdown(f"### 🥧 {fund_symbol} AOS Corporate Finance Asset Breakdown")
 
-            # Create pie chart data for AOS Corporate Finance assets
-            aos_pie_data = aos_current_date.copy()
-            aos_pie_data["percentage"] = aos_pie_data["market_value"] / aos_pie_data["market_value"].sum() * 100
-
-            # Create a function to generate cleaner names for all AOS assets
-            def create_clean_name(asset_name):
-                """Create cleaner asset names using first 5 words"""
-                words = asset_name.split()
-                # Take first 5 words, or all words if fewer than 5
-                clean_name = " ".join(words[:5])
-                return clean_name
-
-            aos_pie_data["clean_name"] = aos_pie_data["name"].apply(create_clean_name)
-
-            pie_chart = alt.Chart(aos_pie_data).mark_arc(innerRadius=50).encode(
-                theta=alt.Theta("market_value:Q", title="Market Value"),
-                color=alt.Color("clean_name:N", title="Asset"),
-                tooltip=["clean_name:N", "market_value:Q", "percentage:Q"]
-            ).properties(height=400)
+            pie_chart = aos_pie_template().properties(data=payload["aos_pie"])
 
             st.altair_chart(pie_chart, use_container_width=True)
 
             # === AOS Corporate Finance Par Value Over Time ===
             st.markdown(f"### 📊 {fund_symbol} AOS Corporate Finance Par Value - Weekly Breakdown")
 
-            # Get all available dates and organize into weeks
-            all_dates = sorted(df["date"].dt.date.unique(), reverse=True)
-
-            # Create weekly groupings (every 5 business days)
-            weekly_data = []
-            week_size = 5  # 5 business days per week
-
-            for week_num in range(min(12, len(all_dates) // week_size)):  # Show up to 12 weeks
-                start_idx = week_num * week_size
-                end_idx = min(start_idx + week_size, len(all_dates))
-                week_dates = all_dates[start_idx:end_idx]
-                
-                if week_dates:
-                    week_df = aos_df[aos_df["date"].dt.date.isin(week_dates)].copy()
-                    week_start = min(week_dates)
-                    week_end = max(week_dates)
-                    
-                    week_label = week_end.strftime("%m/%d/%y")  
-                    
-                    week_df["week"] = week_label
-                    week_df["week_start"] = week_start
-                    week_df["week_end"] = week_end
-                    weekly_data.append(week_df)
-
-            if weekly_data:
-                combined_weekly_df = pd.concat(weekly_data, ignore_index=True)
-
-                # Apply clean name function to all AOS assets
-                combined_weekly_df["clean_name"] = combined_weekly_df["name"].apply(create_clean_name)
-
-                # Aggregate par values by week and asset, keeping week_end for proper sorting
-                weekly_summary = combined_weekly_df.groupby(["week", "week_end", "clean_name"])["par_value"].mean().reset_index()
-
-                # Sort by week_end date to ensure chronological order
-                weekly_summary = weekly_summary.sort_values("week_end", ascending=True)
-                
+            weekly_summary = payload["weekly_summary"]
+            if weekly_summary is not None:
                 # Export button for weekly data
-                csv_buffer = io.StringIO()
-                weekly_summary.to_csv(csv_buffer, index=False)
-                csv_data = csv_buffer.getvalue()
+                csv_data = cached_csv_bytes((fund_symbol, selected_date, "weekly_summary"), weekly_summary)
                 
                 st.download_button(
                     label=f"📥 Download {fund_symbol} Weekly Summary",
@@ -426,15 +740,8 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
                     key=f"{fund_symbol}_weekly_download"
                 )
                 
-                # Create stacked bar chart with proper chronological sorting
-                week_order = weekly_summary.sort_values("week_end")["week"].unique().tolist()
-                stacked_bar_chart = alt.Chart(weekly_summary).mark_bar().encode(
-                    x=alt.X("week:N", title="Week", sort=week_order,
-                            axis=alt.Axis(labelAngle=0)),
-                    y=alt.Y("par_value:Q", title="Average Par Value"),
-                    color=alt.Color("clean_name:N", title="Asset"),
-                    tooltip=["week:N", "clean_name:N", "par_value:Q"]
-                ).properties(height=400)
+                # Create stacked bar chart, sorted chronologically by week_end
+                stacked_bar_chart = weekly_par_bar_template().properties(data=weekly_summary)
                 
                 st.altair_chart(stacked_bar_chart, use_container_width=True)
             else:
@@ -454,60 +761,24 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
                 key=f"{fund_symbol}_date_range"
             )
 
-            # Use all AOS Corporate Finance assets
-            index_df = aos_df.copy() 
-
-            # Filter by selected date range
-            if date_range_option != "All Available Data":
-                # Get all available trading days (sorted descending)
-                all_trading_days = sorted(index_df["date"].dt.date.unique(), reverse=True)
-                
-                # Determine number of days based on selection
-                if date_range_option == "Last 60 Trading Days":
-                    num_days = 60
-                elif date_range_option == "Last 30 Trading Days":
-                    num_days = 30
-                elif date_range_option == "Last 90 Trading Days":
-                    num_days = 90
-                
-                # Get the last N trading days
-                selected_trading_days = all_trading_days[:num_days]
-                
-                # Filter the dataframe to only include these dates
-                index_df = index_df[index_df["date"].dt.date.isin(selected_trading_days)].copy()
-                
-                st.info(f"Showing data for {len(selected_trading_days)} trading days from {min(selected_trading_days)} to {max(selected_trading_days)}")
-
-            # Add clean names for individual asset tracking
-            index_df["clean_name"] = index_df["name"].apply(create_clean_name)
-
-            # Calculate weighted index
-            index_df["weight"] = index_df["market_value"]
-            index_df["price_weighted"] = index_df["price"] * index_df["weight"]
-
-            index_daily = index_df.groupby("date").agg(
-                total_mv=("market_value", "sum"),
-                weighted_price=("price_weighted", "sum")
-            ).reset_index()
-
-            index_daily["Weighted Index"] = index_daily["weighted_price"] / index_daily["total_mv"]
+            # Determine number of days based on selection
+            if date_range_option == "Last 60 Trading Days":
+                num_days = 60
+            elif date_range_option == "Last 30 Trading Days":
+                num_days = 30
+            elif date_range_option == "Last 90 Trading Days":
+                num_days = 90
+            else:
+                num_days = None
 
-            # Sort by date and calculate percentage changes
-            index_daily_sorted = index_daily.sort_values("date").copy()
-            index_daily_sorted["Weighted Index % Change"] = index_daily_sorted["Weighted Index"].pct_change() * 100
+            index_payload = compute_aos_index_payload(fund_symbol, num_days)
 
-            # Calculate moving averages for the percentage changes
-            index_daily_sorted["MA_30"] = index_daily_sorted["Weighted Index % Change"].rolling(window=30, min_periods=1).mean()
-            index_daily_sorted["MA_60"] = index_daily_sorted["Weighted Index % Change"].rolling(window=60, min_periods=1).mean()
-            index_daily_sorted["MA_200"] = index_daily_sorted["Weighted Index % Change"].rolling(window=200, min_periods=1).mean()
+            if index_payload["trading_days"] is not None:
+                day_count, first_day, last_day = index_payload["trading_days"]
+                st.info(f"Showing data for {day_count} trading days from {first_day} to {last_day}")
 
             # Export button for index data
-            index_export = index_daily_sorted[["date", "Weighted Index", "Weighted Index % Change", "MA_30", "MA_60", "MA_200"]].copy()
-            index_export["date"] = index_export["date"].dt.strftime("%Y-%m-%d")
-            
-            csv_buffer = io.StringIO()
-            index_export.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, num_days, "index_daily"), index_payload["index_daily"])
             
             st.download_button(
                 label=f"📥 Download {fund_symbol} Weighted Index Data",
@@ -517,85 +788,14 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
                 key=f"{fund_symbol}_index_download"
             )
 
-            # Prepare individual asset percentage changes for charting
-            individual_pct_changes = index_df.sort_values(["clean_name", "date"]).copy()
-            individual_pct_changes["price_pct_change"] = individual_pct_changes.groupby("clean_name")["price"].pct_change() * 100
-
-            # Pivot individual asset percentage changes
-            individual_pct_pivot = individual_pct_changes.pivot_table(
-                index="date", 
-                columns="clean_name", 
-                values="price_pct_change", 
-                aggfunc="first"
-            ).reset_index()
-
-            # Combine weighted index percentage changes with individual asset percentage changes
-            chart_data = individual_pct_pivot.merge(
-                index_daily_sorted[["date", "Weighted Index % Change", "MA_30", "MA_60", "MA_200"]], 
-                on="date", 
-                how="left"
-            )
-
-            # Rename moving averages for better display
-            chart_data = chart_data.rename(columns={
-                "Weighted Index % Change": "Weighted Index",
-                "MA_30": "30-Day MA",
-                "MA_60": "60-Day MA", 
-                "MA_200": "200-Day MA"
-            })
-
-            # Melt the data for charting
-            chart_data_melted = chart_data.melt(
-                id_vars=["date"], 
-                var_name="Asset", 
-                value_name="Percentage_Change"
-            )
-
-            # Remove NaN values for cleaner chart
-            chart_data_melted = chart_data_melted.dropna(subset=["Percentage_Change"])
-
-            # Create separate datasets for main lines and moving averages
-            main_data = chart_data_melted[~chart_data_melted['Asset'].isin(['30-Day MA', '60-Day MA', '200-Day MA'])].copy()
-            ma_data = chart_data_melted[chart_data_melted['Asset'].isin(['30-Day MA', '60-Day MA', '200-Day MA'])].copy()
-
             # Individual assets and weighted index as solid lines
-            main_lines = alt.Chart(main_data).mark_line(strokeWidth=2).encode(
-                x=alt.X("date:T", 
-                        title="Date",
-                        axis=alt.Axis(
-                            labelAngle=-45, 
-                            format="%m/%d/%y",
-                            labelOverlap=False,
-                            tickCount=10
-                        )),
-                y=alt.Y("Percentage_Change:Q", 
-                        title="Daily % Change", 
-                        scale=alt.Scale(zero=False)),
-                color=alt.Color("Asset:N", title="Asset", scale=alt.Scale(scheme="category20")),
-                tooltip=["date:T", "Asset:N", alt.Tooltip("Percentage_Change:Q", format=".2f", title="% Change")]
-            )
+            main_lines = daily_pct_line_template("category20").properties(data=index_payload["main_data"])
 
             # Moving averages as dashed lines
-            ma_lines = alt.Chart(ma_data).mark_line(strokeDash=[5,5], opacity=0.7, strokeWidth=2).encode(
-                x=alt.X("date:T", 
-                        title="Date",
-                        axis=alt.Axis(
-                            labelAngle=-45, 
-                            format="%m/%d/%y",
-                            labelOverlap=False,
-                            tickCount=10
-                        )),
-                y=alt.Y("Percentage_Change:Q", 
-                        title="Daily % Change",
-                        scale=alt.Scale(zero=False)),
-                color=alt.Color("Asset:N", title="Asset", scale=alt.Scale(scheme="set2")),
-                tooltip=["date:T", "Asset:N", alt.Tooltip("Percentage_Change:Q", format=".2f", title="% Change")]
-            )
+            ma_lines = daily_pct_line_template("set2", dashed=True).properties(data=index_payload["ma_data"])
 
             # Add horizontal line at 0%
-            zero_line = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(color='gray', strokeDash=[2,2], opacity=0.5).encode(
-                y=alt.Y('y:Q')
-            )
+            zero_line = zero_line_template()
 
             # Combine all chart elements
             combined_chart = (main_lines + ma_lines + zero_line).properties(
@@ -610,30 +810,10 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
             # === Last 5 Business Days Price Chart ===
             st.markdown(f"### 📈 {fund_symbol} AOS Corporate Finance % Changes - Last 5 Business Days")
 
-            # Get the last 5 business days from available dates
-            sorted_dates = sorted(df["date"].dt.date.unique(), reverse=True)
-            last_5_dates = sorted_dates[:5]
-
-            # Prepare data for last 5 days with percentage changes
-            last_5_base_df = aos_df.copy()
-
-            # Filter and add clean names
-            last_5_base_df["clean_name"] = last_5_base_df["name"].apply(create_clean_name)
-
-            # Sort and calculate percentage changes for the last 5 days data
-            last_5_sorted_df = last_5_base_df.sort_values(["clean_name", "date"]).copy()
-            last_5_sorted_df["price_pct_change"] = last_5_sorted_df.groupby("clean_name")["price"].pct_change() * 100
-
-            # Filter for last 5 business days
-            last_5_df = last_5_sorted_df[last_5_sorted_df["date"].dt.date.isin(last_5_dates)].copy()
+            last_5_df = payload["last_5"]
 
             # Export button for last 5 days data
-            last_5_export = last_5_df[["date", "clean_name", "price", "price_pct_change", "market_value", "par_value"]].copy()
-            last_5_export["date"] = last_5_export["date"].dt.strftime("%Y-%m-%d")
-            
-            csv_buffer = io.StringIO()
-            last_5_export.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
+            csv_data = cached_csv_bytes((fund_symbol, selected_date, "last_5"), last_5_df)
             
             st.download_button(
                 label=f"📥 Download {fund_symbol} Last 5 Days Data",
@@ -648,17 +828,10 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
 
             # Create the chart for last 5 business days showing percentage changes
             if not last_5_df_clean.empty:
-                last_5_chart = alt.Chart(last_5_df_clean).mark_line(point=True).encode(
-                    x=alt.X("date:T", title="Date"),
-                    y=alt.Y("price_pct_change:Q", title="Daily % Change", scale=alt.Scale(zero=False)),
-                    color=alt.Color("clean_name:N", title="Asset"),
-                    tooltip=["date:T", "clean_name:N", alt.Tooltip("price_pct_change:Q", format=".2f", title="% Change")]
-                ).properties(height=400)
+                last_5_chart = last_5_line_template().properties(data=last_5_df_clean)
 
                 # Add horizontal line at 0%
-                zero_line_last5 = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(color='gray', strokeDash=[2,2], opacity=0.5).encode(
-                    y=alt.Y('y:Q')
-                )
+                zero_line_last5 = zero_line_template()
 
                 # Combine chart with zero line
                 last_5_combined = (last_5_chart + zero_line_last5)
@@ -680,78 +853,142 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
     """)
 
 
-# === Function to render AP Grange Pricing dashboard ===
-def render_hiys_comparison():
-    st.markdown("### 🔄 AP Grange Pricing - Cross-Fund Price Comparison")
-    st.markdown("Compare the price (Market Value / Par Value × 100) of AP Grange Holdings LLC across PRIV, PRSD, GTO, and GTOC funds.")
+# === AP Grange Pricing Data ===
+AP_GRANGE_FUNDS = ("PRIV", "PRSD", "GTO", "GTOC")
 
-    # Load data for all funds
-    df_priv = load_data("PRIV")
-    df_prsd = load_data("PRSD")
-    df_gto = load_data("GTO")
-    df_gtoc = load_data("GTOC")
 
-    # Function to extract AP Grange data and calculate price
-    def get_ap_grange_data(df, fund_name):
-        if df.empty:
-            return pd.DataFrame()
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_ap_grange_frames(stamp):
+    """AP Grange rows, latest row per fund and date x fund price pivot; stamp (db_stamp()) keys the cache to the DB state"""
+    placeholders = ",".join("?" * len(AP_GRANGE_FUNDS))
+    try:
+        # LIKE is case-insensitive for ASCII, matching the old str.upper().str.contains() filter
+        df = pd.read_sql(
+            "SELECT date, name, market_value, par_value, source_identifier AS fund FROM financial_data "
+            f"WHERE name LIKE '%AP GRANGE HOLDINGS%' AND source_identifier IN ({placeholders})",
+            get_conn(),
+            params=AP_GRANGE_FUNDS
+        )
+    except Exception as e:
+        st.error(f"Error loading AP Grange data: {str(e)}")
+        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+
+    df["date"] = pd.to_datetime(df["date"], format="%m/%d/%Y", cache=True)
+    df["market_value"] = pd.to_numeric(df["market_value"], errors="coerce")
+    df["par_value"] = pd.to_numeric(df["par_value"], errors="coerce")
+
+    # Calculate price = market_value / par_value * 100
+    df["price"] = df["market_value"] / df["par_value"] * 100
 
-        # Filter for AP Grange Holdings LLC (case-insensitive search)
-        ap_grange_df = df[df["name"].str.upper().str.contains("AP GRANGE HOLDINGS", na=False)].copy()
+    # Sort by fund and date, then calculate daily price change per fund
+    df.sort_values(["fund", "date"], inplace=True, ignore_index=True)
+    df["price_pct_change"] = sorted_group_change(df, "fund", "price", pct=True) * 100
 
-        if ap_grange_df.empty:
-            return pd.DataFrame()
+    df = df[["date", "name", "market_value", "par_value", "price", "fund", "price_pct_change"]]
 
-        # Calculate price = market_value / par_value * 100
-        ap_grange_df["price"] = ap_grange_df["market_value"] / ap_grange_df["par_value"] * 100
-        ap_grange_df["fund"] = fund_name
-        ap_grange_df["date"] = pd.to_datetime(ap_grange_df["date"])
+    # Latest row per fund (frame is sorted by fund/date)
+    latest_by_fund = df.groupby("fund", sort=False).tail(1).set_index("fund")
+
+    # Prices by date and fund for the historical table, newest first
+    pivot_df = df.pivot_table(
+        index="date",
+        columns="fund",
+        values="price",
+        aggfunc="first"
+    ).reset_index()
+    pivot_df = pivot_df.sort_values("date", ascending=False)
+
+    return df, latest_by_fund, pivot_df
+
+
+# === AP Grange Chart Specs ===
+# Plain Vega-Lite dicts skip Altair's schema validation on every render
+AP_GRANGE_DATE_X = {
+    "field": "date", "type": "temporal", "title": "Date",
+    "axis": {"labelAngle": -45, "format": "%m/%d/%y"}
+}
+AP_GRANGE_FUND_COLOR = {
+    "field": "fund", "type": "nominal", "title": "Fund",
+    "scale": {"domain": list(AP_GRANGE_FUNDS), "range": ["#1f77b4", "#ff7f0e", "#d62728", "#9467bd"]}
+}
+
+AP_GRANGE_PRICE_SPEC = {
+    "mark": {"type": "line", "point": True, "strokeWidth": 2},
+    "encoding": {
+        "x": AP_GRANGE_DATE_X,
+        "y": {"field": "price", "type": "quantitative", "title": "Price (MV/PV × 100)", "scale": {"zero": False}},
+        "color": AP_GRANGE_FUND_COLOR,
+        "tooltip": [
+            {"field": "date", "type": "temporal", "title": "Date", "format": "%m/%d/%Y"},
+            {"field": "fund", "type": "nominal", "title": "Fund"},
+            {"field": "price", "type": "quantitative", "title": "Price", "format": ".4f"},
+            {"field": "market_value", "type": "quantitative", "title": "Market Value", "format": "$,.2f"},
+            {"field": "par_value", "type": "quantitative", "title": "Par Value", "format": "$,.2f"}
+        ]
+    },
+    "height": 400,
+    "title": "AP Grange Pricing - Price Comparison Across Funds"
+}
+
+# Only the fields each spec encodes are shipped to the browser
+AP_GRANGE_PRICE_COLUMNS = ["date", "fund", "price", "market_value", "par_value"]
+AP_GRANGE_PCT_COLUMNS = ["date", "fund", "price_pct_change"]
+
+AP_GRANGE_PCT_SPEC = {
+    "layer": [
+        {
+            "mark": {"type": "line", "point": True, "strokeWidth": 2},
+            "encoding": {
+                "x": AP_GRANGE_DATE_X,
+                "y": {"field": "price_pct_change", "type": "quantitative", "title": "Daily % Change", "scale": {"zero": False}},
+                "color": AP_GRANGE_FUND_COLOR,
+                "tooltip": [
+                    {"field": "date", "type": "temporal", "title": "Date", "format": "%m/%d/%Y"},
+                    {"field": "fund", "type": "nominal", "title": "Fund"},
+                    {"field": "price_pct_change", "type": "quantitative", "title": "% Change", "format": ".2f"}
+                ]
+            }
+        },
+        {
+            # Zero line
+            "data": {"values": [{"y": 0}]},
+            "mark": {"type": "rule", "color": "gray", "strokeDash": [2, 2], "opacity": 0.5},
+            "encoding": {"y": {"field": "y", "type": "quantitative"}}
+        }
+    ],
+    "height": 400,
+    "title": "AP Grange Pricing - Daily % Change Comparison"
+}
 
-        return ap_grange_df[["date", "name", "market_value", "par_value", "price", "fund"]]
 
-    # Get AP Grange data from each fund
-    priv_ap_grange = get_ap_grange_data(df_priv, "PRIV")
-    prsd_ap_grange = get_ap_grange_data(df_prsd, "PRSD")
-    gto_ap_grange = get_ap_grange_data(df_gto, "GTO")
-    gtoc_ap_grange = get_ap_grange_data(df_gtoc, "GTOC")
+# === Function to render AP Grange Pricing dashboard ===
+@st.fragment
+def render_hiys_comparison():
+    st.markdown("### 🔄 AP Grange Pricing - Cross-Fund Price Comparison")
+    st.markdown("Compare the price (Market Value / Par Value × 100) of AP Grange Holdings LLC across PRIV, PRSD, GTO, and GTOC funds.")
 
-    # Combine all data
-    all_ap_grange = pd.concat([priv_ap_grange, prsd_ap_grange, gto_ap_grange, gtoc_ap_grange], ignore_index=True)
+    stamp = db_stamp()
+    all_ap_grange, latest_by_fund, pivot_df = load_ap_grange_frames(stamp)
 
     if all_ap_grange.empty:
         st.warning("No AP Grange Holdings LLC data found in any fund.")
         return
-    
-    # Sort by date
-    all_ap_grange = all_ap_grange.sort_values(["fund", "date"])
-    
-    # Calculate daily price change per fund
-    all_ap_grange["price_pct_change"] = all_ap_grange.groupby("fund")["price"].pct_change() * 100
-    
+
     # === Summary Metrics ===
     st.markdown("---")
     st.subheader("📊 Current Price Comparison")
 
-    col1, col2, col3, col4 = st.columns(4)
-
     # Get latest price for each fund
-    for col, fund_name, fund_df in [(col1, "PRIV", priv_ap_grange),
-                                      (col2, "PRSD", prsd_ap_grange),
-                                      (col3, "GTO", gto_ap_grange),
-                                      (col4, "GTOC", gtoc_ap_grange)]:
+    for col, fund_name in zip(st.columns(4), AP_GRANGE_FUNDS):
         with col:
-            if not fund_df.empty:
-                # Sort by date and calculate pct change for this fund
-                fund_df_sorted = fund_df.sort_values("date").copy()
-                fund_df_sorted["price_pct_change"] = fund_df_sorted["price"].pct_change() * 100
-
-                latest = fund_df_sorted.iloc[-1]
-                latest_pct = fund_df_sorted["price_pct_change"].iloc[-1] if len(fund_df_sorted) > 1 else None
+            if fund_name in latest_by_fund.index:
+                latest = latest_by_fund.loc[fund_name]
+                latest_pct = latest["price_pct_change"]
 
                 st.metric(
                     label=f"{fund_name} Price",
                     value=f"{latest['price']:.4f}",
-                    delta=f"{latest_pct:.2f}%" if latest_pct is not None and pd.notna(latest_pct) else None
+                    delta=f"{latest_pct:.2f}%" if pd.notna(latest_pct) else None
                 )
                 st.caption(f"As of {latest['date'].strftime('%m/%d/%Y')}")
             else:
@@ -761,35 +998,25 @@ def render_hiys_comparison():
     st.markdown("---")
     st.subheader("📋 Asset-Level Price and Value Movements")
 
-    # Create a comparison table with latest data from each fund
-    comparison_data = []
-    for fund_name, fund_df in [("PRIV", priv_ap_grange), ("PRSD", prsd_ap_grange), ("GTO", gto_ap_grange), ("GTOC", gtoc_ap_grange)]:
-        if not fund_df.empty:
-            # Sort and calculate pct change
-            fund_df_sorted = fund_df.sort_values("date").copy()
-            fund_df_sorted["price_pct_change"] = fund_df_sorted["price"].pct_change() * 100
-
-            latest = fund_df_sorted.iloc[-1]
-            latest_pct = fund_df_sorted["price_pct_change"].iloc[-1] if len(fund_df_sorted) > 1 else None
-
-            comparison_data.append({
-                "Fund": fund_name,
-                "Date": latest["date"].strftime("%m/%d/%Y"),
-                "Name": latest["name"],
-                "Market Value": latest["market_value"],
-                "Par Value": latest["par_value"],
-                "Price": latest["price"],
-                "Price % Change": latest_pct if pd.notna(latest_pct) else None
-            })
+    # Create a comparison table with latest data from each fund, in fund order
+    comparison_df = latest_by_fund.reindex(
+        [fund_name for fund_name in AP_GRANGE_FUNDS if fund_name in latest_by_fund.index]
+    ).reset_index()
+    comparison_df = pd.DataFrame({
+        "Fund": comparison_df["fund"],
+        "Date": comparison_df["date"].dt.strftime("%m/%d/%Y"),
+        "Name": comparison_df["name"],
+        "Market Value": comparison_df["market_value"],
+        "Par Value": comparison_df["par_value"],
+        "Price": comparison_df["price"],
+        "Price % Change": comparison_df["price_pct_change"]
+    })
     
-    if comparison_data:
-        comparison_df = pd.DataFrame(comparison_data)
+    if not comparison_df.empty:
         st.dataframe(comparison_df, use_container_width=True, hide_index=True)
         
         # Export button
-        csv_buffer = io.StringIO()
-        comparison_df.to_csv(csv_buffer, index=False)
-        csv_data = csv_buffer.getvalue()
+        csv_data = cached_csv_bytes(("ap_grange_comparison", stamp), comparison_df)
         
         st.download_button(
             label="📥 Download Comparison Data",
@@ -812,11 +1039,10 @@ def render_hiys_comparison():
             key="hiys_date_range"
         )
         
-        chart_df = all_ap_grange.copy()
+        chart_df = all_ap_grange
+        cutoff = None
         
         if date_range_option != "All Available Data":
-            all_dates = sorted(chart_df["date"].dt.date.unique(), reverse=True)
-            
             if date_range_option == "Last 30 Days":
                 num_days = 30
             elif date_range_option == "Last 60 Days":
@@ -824,85 +1050,33 @@ def render_hiys_comparison():
             elif date_range_option == "Last 90 Days":
                 num_days = 90
             
-            selected_dates = all_dates[:num_days]
-            chart_df = chart_df[chart_df["date"].dt.date.isin(selected_dates)]
+            # Earliest of the last num_days trading days, so the filter is one datetime64 comparison
+            cutoff = pd.Timestamp(sorted_trading_days(all_ap_grange)[-num_days:][0])
+            chart_df = chart_df[chart_df["date"] >= cutoff]
         
         # Price chart
-        price_chart = alt.Chart(chart_df).mark_line(point=True, strokeWidth=2).encode(
-            x=alt.X("date:T", title="Date", axis=alt.Axis(labelAngle=-45, format="%m/%d/%y")),
-            y=alt.Y("price:Q", title="Price (MV/PV × 100)", scale=alt.Scale(zero=False)),
-            color=alt.Color("fund:N", title="Fund", scale=alt.Scale(
-                domain=["PRIV", "PRSD", "GTO", "GTOC"],
-                range=["#1f77b4", "#ff7f0e", "#d62728", "#9467bd"]
-            )),
-            tooltip=[
-                alt.Tooltip("date:T", title="Date", format="%m/%d/%Y"),
-                alt.Tooltip("fund:N", title="Fund"),
-                alt.Tooltip("price:Q", title="Price", format=".4f"),
-                alt.Tooltip("market_value:Q", title="Market Value", format="$,.2f"),
-                alt.Tooltip("par_value:Q", title="Par Value", format="$,.2f")
-            ]
-        ).properties(height=400, title="AP Grange Pricing - Price Comparison Across Funds")
-        
-        st.altair_chart(price_chart, use_container_width=True)
+        st.vega_lite_chart(chart_df[AP_GRANGE_PRICE_COLUMNS], AP_GRANGE_PRICE_SPEC, use_container_width=True)
         
         # === Price Percentage Change Chart ===
         st.markdown("### 📉 Daily Price % Change Comparison")
         
-        pct_change_df = chart_df.dropna(subset=["price_pct_change"])
+        pct_change_df = chart_df[AP_GRANGE_PCT_COLUMNS].dropna(subset=["price_pct_change"])
         
         if not pct_change_df.empty:
-            pct_chart = alt.Chart(pct_change_df).mark_line(point=True, strokeWidth=2).encode(
-                x=alt.X("date:T", title="Date", axis=alt.Axis(labelAngle=-45, format="%m/%d/%y")),
-                y=alt.Y("price_pct_change:Q", title="Daily % Change", scale=alt.Scale(zero=False)),
-                color=alt.Color("fund:N", title="Fund", scale=alt.Scale(
-                    domain=["PRIV", "PRSD", "GTO", "GTOC"],
-                    range=["#1f77b4", "#ff7f0e", "#d62728", "#9467bd"]
-                )),
-                tooltip=[
-                    alt.Tooltip("date:T", title="Date", format="%m/%d/%Y"),
-                    alt.Tooltip("fund:N", title="Fund"),
-                    alt.Tooltip("price_pct_change:Q", title="% Change", format=".2f")
-                ]
-            )
-            
-            # Add zero line
-            zero_line = alt.Chart(pd.DataFrame({'y': [0]})).mark_rule(
-                color='gray', strokeDash=[2,2], opacity=0.5
-            ).encode(y=alt.Y('y:Q'))
-            
-            combined_pct_chart = (pct_chart + zero_line).properties(
-                height=400,
-                title="AP Grange Pricing - Daily % Change Comparison"
-            )
-            
-            st.altair_chart(combined_pct_chart, use_container_width=True)
+            st.vega_lite_chart(pct_change_df, AP_GRANGE_PCT_SPEC, use_container_width=True)
         
         # === Historical Data Table ===
         st.markdown("---")
         st.subheader("📜 Historical Data")
         
-        # Pivot table showing prices by date and fund
-        pivot_df = chart_df.pivot_table(
-            index="date",
-            columns="fund",
-            values="price",
-            aggfunc="first"
-        ).reset_index()
+        # Cached pivot table showing prices by date and fund, limited to the charted range
+        if cutoff is not None:
+            pivot_df = pivot_df[pivot_df["date"] >= cutoff]
         
-        # Sort by date BEFORE converting to string for proper chronological order
-        pivot_df = pivot_df.sort_values("date", ascending=False)
-        pivot_df["date"] = pivot_df["date"].dt.strftime("%m/%d/%Y")
-        
-        st.dataframe(pivot_df, use_container_width=True, hide_index=True)
+        st.dataframe(pivot_df, use_container_width=True, hide_index=True, column_config=DISPLAY_DATE_COLUMN)
         
         # Export historical data
-        export_df = all_ap_grange.copy()
-        export_df["date"] = export_df["date"].dt.strftime("%Y-%m-%d")
-        
-        csv_buffer = io.StringIO()
-        export_df.to_csv(csv_buffer, index=False)
-        csv_data = csv_buffer.getvalue()
+        csv_data = cached_csv_bytes(("ap_grange_historical", stamp), all_ap_grange)
         
         st.download_button(
             label="📥 Download Full Historical Data",
@@ -682,52 +682,48 @@ def render_fund_dashboard(fund_symbol, df, selected_date):
     """)
 
 
+# === Load AP Grange Data Function ===
+@st.cache_data
+def load_ap_grange(fund_symbol):
+    df = load_data(fund_symbol)
+    if df.empty:
+        return pd.DataFrame()
+    
+    # Filter for AP Grange Holdings LLC (case-insensitive literal search, no uppercased copy of the column)
+    ap_grange_df = df[df["name"].str.contains("AP GRANGE HOLDINGS", case=False, regex=False, na=False)]
+    
+    if ap_grange_df.empty:
+        return pd.DataFrame()
+    
+    # Dates are already parsed by load_data; sort once so the pct change is computed a single time
+    ap_grange_df = ap_grange_df.sort_values("date")
+    
+    # Calculate price = market_value / par_value * 100 and its daily % change
+    ap_grange_df["price"] = ap_grange_df["market_value"] / ap_grange_df["par_value"] * 100
+    ap_grange_df["fund"] = fund_symbol
+    ap_grange_df["price_pct_change"] = ap_grange_df["price"].pct_change() * 100
+    
+    return ap_grange_df[["date", "name", "market_value", "par_value", "price", "fund", "price_pct_change"]]
+
+
 # === Function to render HIYS comparison dashboard ===
 def render_hiys_comparison():
     st.markdown("### 🔄 AP Grange Holdings LLC - Cross-Fund Price Comparison")
     st.markdown("Compare the price (Market Value / Par Value × 100) of AP Grange Holdings LLC across PRIV, PRSD, and HIYS funds.")
     
-    # Load data for all three funds
-    df_priv = load_data("PRIV")
-    df_prsd = load_data("PRSD")
-    df_hiys = load_data("HIYS")
-    
-    # Function to extract AP Grange data and calculate price
-    def get_ap_grange_data(df, fund_name):
-        if df.empty:
-            return pd.DataFrame()
-        
-        # Filter for AP Grange Holdings LLC (case-insensitive search)
-        ap_grange_df = df[df["name"].str.upper().str.contains("AP GRANGE HOLDINGS", na=False)].copy()
-        
-        if ap_grange_df.empty:
-            return pd.DataFrame()
-        
-        # Calculate price = market_value / par_value * 100
-        ap_grange_df["price"] = ap_grange_df["market_value"] / ap_grange_df["par_value"] * 100
-        ap_grange_df["fund"] = fund_name
-        ap_grange_df["date"] = pd.to_datetime(ap_grange_df["date"])
-        
-        return ap_grange_df[["date", "name", "market_value", "par_value", "price", "fund"]]
+    # Get precomputed AP Grange data from each fund
+    priv_ap_grange = load_ap_grange("PRIV")
+    prsd_ap_grange = load_ap_grange("PRSD")
+    hiys_ap_grange = load_ap_grange("HIYS")
     
-    # Get AP Grange data from each fund
-    priv_ap_grange = get_ap_grange_data(df_priv, "PRIV")
-    prsd_ap_grange = get_ap_grange_data(df_prsd, "PRSD")
-    hiys_ap_grange = get_ap_grange_data(df_hiys, "HIYS")
-    
-    # Combine all data
-    all_ap_grange = pd.concat([priv_ap_grange, prsd_ap_grange, hiys_ap_grange], ignore_index=True)
+    # Combine all data; each frame is already date-sorted, so concatenating in fund name
+    # order gives the fund/date ordering without a separate sort_values copy
+    all_ap_grange = pd.concat([hiys_ap_grange, priv_ap_grange, prsd_ap_grange], ignore_index=True)
     
     if all_ap_grange.empty:
         st.warning("No AP Grange Holdings LLC data found in any fund.")
         return
     
-    # Sort by date
-    all_ap_grange = all_ap_grange.sort_values(["fund", "date"])
-    
-    # Calculate daily price change per fund
-    all_ap_grange["price_pct_change"] = all_ap_grange.groupby("fund")["price"].pct_change() * 100
-    
     # === Summary Metrics ===
     st.markdown("---")
     st.subheader("📊 Current Price Comparison")
@@ -740,17 +736,14 @@ def render_hiys_comparison():
                                       (col3, "HIYS", hiys_ap_grange)]:
         with col:
             if not fund_df.empty:
-                # Sort by date and calculate pct change for this fund
-                fund_df_sorted = fund_df.sort_values("date").copy()
-                fund_df_sorted["price_pct_change"] = fund_df_sorted["price"].pct_change() * 100
-                
-                latest = fund_df_sorted.iloc[-1]
-                latest_pct = fund_df_sorted["price_pct_change"].iloc[-1] if len(fund_df_sorted) > 1 else None
+                # Frames come sorted by date with pct change precomputed
+                latest = fund_df.iloc[-1]
+                latest_pct = latest["price_pct_change"]
                 
                 st.metric(
                     label=f"{fund_name} Price",
                     value=f"{latest['price']:.4f}",
-                    delta=f"{latest_pct:.2f}%" if latest_pct is not None and pd.notna(latest_pct) else None
+                    delta=f"{latest_pct:.2f}%" if pd.notna(latest_pct) else None
                 )
                 st.caption(f"As of {latest['date'].strftime('%m/%d/%Y')}")
             else:
@@ -764,12 +757,8 @@ def render_hiys_comparison():
     comparison_data = []
     for fund_name, fund_df in [("PRIV", priv_ap_grange), ("PRSD", prsd_ap_grange), ("HIYS", hiys_ap_grange)]:
         if not fund_df.empty:
-            # Sort and calculate pct change
-            fund_df_sorted = fund_df.sort_values("date").copy()
-            fund_df_sorted["price_pct_change"] = fund_df_sorted["price"].pct_change() * 100
-            
-            latest = fund_df_sorted.iloc[-1]
-            latest_pct = fund_df_sorted["price_pct_change"].iloc[-1] if len(fund_df_sorted) > 1 else None
+            latest = fund_df.iloc[-1]
+            latest_pct = latest["price_pct_change"]
             
             comparison_data.append({
                 "Fund": fund_name,
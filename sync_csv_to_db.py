@@ -7,12 +7,41 @@ import argparse
 from datetime import datetime
 import requests
 import re
+from openpyxl import load_workbook
 
 # =============================================================================
 # INVESCO CONFIGURATION
 # =============================================================================
 INVESCO_TARGET_COMPANY = "AP Grange Holdings LLC"
 
+# =============================================================================
+# SYNC CONFIGURATION
+# =============================================================================
+CSV_CHUNK_SIZE = 50_000  # Rows per chunk when streaming a CSV into the database
+
+# Connection tuning for bulk writes: WAL + NORMAL sync so an insert pays for a single fsync
+# at commit, a 64 MB page cache, in-memory temp storage for the unique-index b-tree work,
+# and 256 MB of memory-mapped I/O
+SQLITE_WRITE_PRAGMAS = [
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "cache_size=-65536",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+]
+
+# financial_data TEXT columns; read from CSV as strings so values are stored exactly as written
+# (no leading-zero loss on identifiers) whatever rows land in a chunk. coupon is left to
+# inference: Invesco files write '6.50' and history stores the parsed '6.5'
+TEXT_COLUMNS = [
+    "date", "name", "identifier", "sedol",
+    "local_currency", "maturity", "asset_breakdown", "source_identifier"
+]
+
+def normalize_columns(columns):
+    """Map source column headers to financial_data column names ('Par Value' -> 'par_value')."""
+    return [str(col).lower().replace(" ", "_") for col in columns]
+
 # =============================================================================
 # SSGA DOWNLOAD FUNCTIONS
 # =============================================================================
@@ -22,15 +51,17 @@ def download_latest_priv_xlsx(output_path):
     headers = {"User-Agent": "Mozilla/5.0"}
     try:
         print(f"Downloading latest PRIV XLSX from {url} ...")
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            print(f"Downloaded to {output_path}")
-            return True
-        else:
-            print(f"Failed to download file: {response.status_code}")
-            return False
+        with requests.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 200:
+                # Stream the body to disk in 1 MB chunks instead of buffering it all in memory
+                with open(output_path, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                print(f"Downloaded to {output_path}")
+                return True
+            else:
+                print(f"Failed to download file: {response.status_code}")
+                return False
     except Exception as e:
         print(f"Error downloading file: {e}")
         return False
@@ -179,6 +210,9 @@ def convert_invesco_csv(input_file: str, output_file: str = None, ticker: str =
     # Create DataFrame with single row
     output_df = pd.DataFrame([transformed_data])
     
+    # Write DB-shaped column names so the sync step needs no renaming
+    output_df.columns = normalize_columns(output_df.columns)
+    
     # Generate output filename if not provided (MMDDYYYYTICKER.csv)
     if output_file is None:
         date_parts = extracted_date.split('/')
@@ -204,23 +238,25 @@ def convert_invesco_csv(input_file: str, output_file: str = None, ticker: str =
 # XLSX FUNCTIONS
 # =============================================================================
 
-def extract_value_from_b2(input_file, sheet_name=0):
+def extract_value_from_b2(input_file, sheet_name=0, rows=None):
     """
     Extract value from cell B2 in the XLSX file for use as filename suffix.
     
     Args:
         input_file (str): Path to input XLSX file
         sheet_name (str/int): Sheet name or index (default: 0)
+        rows (list): Sheet rows already read by read_xlsx_rows (optional, avoids reopening the file)
     
     Returns:
         str: Cleaned value from B2 suitable for filename, or 'DATA' as fallback
     """
     try:
         print(f"Extracting value from cell B2 in: {input_file}")
-        b2_df = pd.read_excel(input_file, sheet_name=sheet_name, header=None, nrows=2)
-        
-        # Get value from cell B2 (row 1, column 1 in 0-based indexing)
-        b2_value = b2_df.iloc[1, 1]  # Row 2, Column B
+        if rows is not None:
+            # Get value from cell B2 (row 1, column 1 in 0-based indexing)
+            b2_value = rows[1][1] if len(rows) > 1 and len(rows[1]) > 1 else None
+        else:
+            b2_value = read_xlsx_cell(input_file, "B2", sheet_name)
         
         if pd.isna(b2_value):
             print("Warning: Cell B2 is empty, using 'DATA' as fallback")
@@ -247,73 +283,93 @@ def extract_value_from_b2(input_file, sheet_name=0):
         print("Using 'DATA' as fallback")
         return "DATA"
 
-def extract_date_from_b3(input_file, sheet_name=0):
+def read_xlsx_cell(input_file, cell, sheet_name=0):
+    """
+    Read a single cell value with openpyxl in read-only mode, without loading the whole sheet.
+    
+    Args:
+        input_file (str): Path to input XLSX file
+        cell (str): Cell reference, e.g. 'B3'
+        sheet_name (str/int): Sheet name or index (default: 0)
+    
+    Returns:
+        The cell value (str, datetime, number or None)
+    """
+    wb = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        return ws[cell].value
+    finally:
+        wb.close()
+
+def read_xlsx_rows(input_file, sheet_name=0):
+    """
+    Read every row of a sheet in one openpyxl read-only pass.
+    
+    Args:
+        input_file (str): Path to input XLSX file
+        sheet_name (str/int): Sheet name or index (default: 0)
+    
+    Returns:
+        list: Row value tuples with trailing empty rows dropped and whole-number
+              floats stored as int, matching what pd.read_excel produces
+    """
+    wb = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]
+        rows = [
+            tuple(int(v) if isinstance(v, float) and v.is_integer() else v for v in row)
+            for row in ws.iter_rows(values_only=True)
+        ]
+    finally:
+        wb.close()
+    
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    return rows
+
+def extract_date_from_b3(input_file, sheet_name=0, rows=None):
     """
     Extract date value from cell B3 in the XLSX file, stripping 'As of' prefix.
     
     Args:
         input_file (str): Path to input XLSX file
         sheet_name (str/int): Sheet name or index (default: 0)
+        rows (list): Sheet rows already read by read_xlsx_rows (optional, avoids reopening the file)
     
     Returns:
         str: Formatted date string (M/D/YYYY) or None if extraction failed
     """
     try:
         print(f"Extracting date from cell B3 in: {input_file}")
-        date_df = pd.read_excel(input_file, sheet_name=sheet_name, header=None, nrows=3)
-        
-        # Get value from cell B3 (row 2, column 1 in 0-based indexing)
-        date_value = date_df.iloc[2, 1]  # Row 3, Column B
+        if rows is not None:
+            # Get value from cell B3 (row 2, column 1 in 0-based indexing)
+            date_value = rows[2][1] if len(rows) > 2 and len(rows[2]) > 1 else None
+        else:
+            date_value = read_xlsx_cell(input_file, "B3", sheet_name)
         
-        if pd.isna(date_value):
+        if date_value is None:
             print("Warning: Cell B3 is empty")
             return None
         
-        # Convert to string and strip 'As of' prefix
-        date_str = str(date_value).strip()
-        
-        # Remove 'As of' prefix (case insensitive)
-        if date_str.lower().startswith('as of'):
-            date_str = date_str[5:].strip()  # Remove 'As of' and any following spaces
-        
-        print(f"Raw date value from B3: '{date_value}'")
-        print(f"Cleaned date string: '{date_str}'")
-        
-        # Try to parse the date with multiple formats
-        date_formats = [
-            "%d-%b-%Y",      # 28-Jul-2025
-            "%d-%B-%Y",      # 28-July-2025
-            "%m/%d/%Y",      # 7/28/2025
-            "%m-%d-%Y",      # 7-28-2025
-            "%Y-%m-%d",      # 2025-07-28
-            "%d/%m/%Y",      # 28/7/2025
-            "%b %d, %Y",     # Jul 28, 2025
-            "%B %d, %Y",     # July 28, 2025
-        ]
-        
-        parsed_date = None
-        
-        # If it's already a pandas Timestamp, use it directly
-        if isinstance(date_value, pd.Timestamp):
+        # A real date cell comes back as a datetime and needs no parsing
+        if isinstance(date_value, datetime):
             parsed_date = date_value
         else:
-            # Try parsing with different formats
-            for fmt in date_formats:
-                try:
-                    parsed_date = pd.to_datetime(date_str, format=fmt)
-                    print(f"Successfully parsed date using format: {fmt}")
-                    break
-                except:
-                    continue
+            # Convert to string and strip 'As of' prefix (case insensitive)
+            date_str = str(date_value).strip()
+            if date_str.lower().startswith('as of'):
+                date_str = date_str[5:].strip()
+            
+            print(f"Raw date value from B3: '{date_value}'")
+            print(f"Cleaned date string: '{date_str}'")
             
-            # If no format worked, try pandas' smart parsing
-            if parsed_date is None:
-                try:
-                    parsed_date = pd.to_datetime(date_str)
-                    print("Successfully parsed date using pandas auto-detection")
-                except:
-                    print(f"Warning: Could not parse date '{date_str}' with any known format")
-                    return None
+            # One auto-detecting parse covers 28-Jul-2025, 7/28/2025, 2025-07-28, Jul 28, 2025, ...
+            try:
+                parsed_date = pd.to_datetime(date_str)
+            except (ValueError, OverflowError):
+                print(f"Warning: Could not parse date '{date_str}'")
+                return None
         
         # Format as M/D/YYYY (removing leading zeros)
         formatted_date = parsed_date.strftime("%-m/%-d/%Y") if os.name != 'nt' else parsed_date.strftime("%#m/%#d/%Y")
@@ -325,19 +381,18 @@ def extract_date_from_b3(input_file, sheet_name=0):
         print(f"Error extracting date from B3: {str(e)}")
         return None
 
-def convert_xlsx_to_csv(input_file, output_file=None, skip_rows=4, skip_footer=37, sheet_name=0):
+def load_xlsx_dataframe(input_file, skip_rows=4, skip_footer=37, sheet_name=0):
     """
-    Convert XLSX file to CSV while trimming rows from top and/or bottom.
+    Load the holdings table from an XLSX file, trimmed and tagged with the B3 date and B2 source.
     
     Args:
         input_file (str): Path to input XLSX file
-        output_file (str): Path to output CSV file (optional)
         skip_rows (int): Number of rows to skip from the top (default: 4 for PRIV files)
         skip_footer (int): Number of rows to skip from the bottom
-        sheet_name (str/int): Sheet name or index to convert (default: 0)
+        sheet_name (str/int): Sheet name or index to load (default: 0)
     
     Returns:
-        str: Path to the created CSV file, or None if conversion failed
+        tuple: (DataFrame with DB column names, extracted date, B2 value), or None if loading failed
     """
     
     try:
@@ -346,59 +401,43 @@ def convert_xlsx_to_csv(input_file, output_file=None, skip_rows=4, skip_footer=3
             print(f"Error: Input file '{input_file}' not found.")
             return None
         
+        # Read the workbook once; B2, B3 and the holdings table all come from these rows
+        print(f"Reading XLSX file: {input_file}")
+        rows = read_xlsx_rows(input_file, sheet_name)
+        
         # Extract date from B3 for the date column
-        extracted_date = extract_date_from_b3(input_file, sheet_name)
+        extracted_date = extract_date_from_b3(input_file, sheet_name, rows=rows)
         
         # Extract value from B2 for filename suffix and data column
         try:
-            b2_value = extract_value_from_b2(input_file, sheet_name)
+            b2_value = extract_value_from_b2(input_file, sheet_name, rows=rows)
         except ValueError as e:
             print(str(e))
             print("Please check that cell B2 contains a valid identifier (alphanumeric characters).")
             return None
         
-        # Generate output filename if not provided
-        if output_file is None:
-            try:
-                # Use the extracted date for filename
-                if extracted_date:
-                    # Convert date format from M/D/YYYY to MMDDYYYY for filename
-                    date_parts = extracted_date.split("/")
-                    month = date_parts[0].zfill(2)
-                    day = date_parts[1].zfill(2)
-                    year = date_parts[2]
-                    date_str = f"{month}{day}{year}"
-                else:
-                    # Fallback to current date
-                    print("Warning: Using current date for filename")
-                    date_str = datetime.now().strftime("%m%d%Y")
-                
-                # Create filename with date and B2 value suffix
-                input_dir = os.path.dirname(input_file)
-                output_file = os.path.join(input_dir, f"{date_str}{b2_value}.csv")
-                print(f"Generated CSV filename: {output_file}")
-                
-            except Exception as e:
-                print(f"Warning: Could not generate filename, using default naming: {e}")
-                base_name = os.path.splitext(input_file)[0]
-                output_file = f"{base_name}.csv"
-        
-        # Read the XLSX file for conversion
-        print(f"Reading XLSX file: {input_file} (skipping {skip_rows} rows)")
-        df = pd.read_excel(input_file, sheet_name=sheet_name, skiprows=skip_rows)
+        # Build the holdings table from the rows below the skipped header block
+        print(f"Building table from XLSX rows (skipping {skip_rows} rows)")
+        header = [
+            col if col is not None else f"Unnamed: {i}"
+            for i, col in enumerate(rows[skip_rows] if len(rows) > skip_rows else ())
+        ]
+        data_rows = rows[skip_rows + 1:]
         
         # Skip rows from the bottom if specified
         if skip_footer > 0:
-            df = df.iloc[:-skip_footer]
+            data_rows = data_rows[:-skip_footer]
+        
+        # Drop rows with no data at all while they are still tuples, so the date and
+        # source can be broadcast to every remaining row without building a mask frame
+        data_rows = [row for row in data_rows if any(value is not None for value in row)]
+        df = pd.DataFrame(data_rows, columns=header)
         
         # Add date column with the extracted date value
         if extracted_date:
             print(f"Adding date column with value: {extracted_date}")
-            # Only add date to rows that have data in other columns (not all NaN)
-            mask = df.notna().any(axis=1)  # True for rows with at least one non-NaN value
-            df['Date'] = None  # Initialize column
-            df.loc[mask, 'Date'] = extracted_date  # Set date only for rows with data
-            print(f"Added date to {mask.sum()} rows with data")
+            df['Date'] = extracted_date
+            print(f"Added date to {len(df)} rows with data")
         else:
             print("ERROR: Could not extract date from B3. Cannot proceed without date.")
             print("Please check that cell B3 contains a valid date in the format 'As of DD-MMM-YYYY'")
@@ -406,10 +445,80 @@ def convert_xlsx_to_csv(input_file, output_file=None, skip_rows=4, skip_footer=3
         
         # Add B2 value column
         print(f"Adding B2 value column with value: {b2_value}")
-        mask = df.notna().any(axis=1)  # True for rows with at least one non-NaN value
-        df['Source_Identifier'] = None  # Initialize column
-        df.loc[mask, 'Source_Identifier'] = b2_value  # Set B2 value only for rows with data
-        print(f"Added source identifier to {mask.sum()} rows with data")
+        df['Source_Identifier'] = b2_value
+        print(f"Added source identifier to {len(df)} rows with data")
+        
+        # Use DB-shaped column names so neither the CSV nor the sync step needs renaming
+        df.columns = normalize_columns(df.columns)
+        
+        return df, extracted_date, b2_value
+        
+    except Exception as e:
+        print(f"[ERROR] Error loading XLSX file: {str(e)}")
+        return None
+
+def xlsx_csv_filename(input_file, extracted_date, b2_value):
+    """
+    Build the MMDDYYYY<SOURCE>.csv path used for processed XLSX files.
+    
+    Args:
+        input_file (str): Path to the source XLSX file
+        extracted_date (str): Date from B3 in M/D/YYYY format
+        b2_value (str): Source identifier from B2
+    
+    Returns:
+        str: CSV path next to the input file
+    """
+    try:
+        # Use the extracted date for filename
+        if extracted_date:
+            # Convert date format from M/D/YYYY to MMDDYYYY for filename
+            date_parts = extracted_date.split("/")
+            month = date_parts[0].zfill(2)
+            day = date_parts[1].zfill(2)
+            year = date_parts[2]
+            date_str = f"{month}{day}{year}"
+        else:
+            # Fallback to current date
+            print("Warning: Using current date for filename")
+            date_str = datetime.now().strftime("%m%d%Y")
+        
+        # Create filename with date and B2 value suffix
+        input_dir = os.path.dirname(input_file)
+        output_file = os.path.join(input_dir, f"{date_str}{b2_value}.csv")
+        print(f"Generated CSV filename: {output_file}")
+        
+    except Exception as e:
+        print(f"Warning: Could not generate filename, using default naming: {e}")
+        base_name = os.path.splitext(input_file)[0]
+        output_file = f"{base_name}.csv"
+    
+    return output_file
+
+def convert_xlsx_to_csv(input_file, output_file=None, skip_rows=4, skip_footer=37, sheet_name=0):
+    """
+    Convert XLSX file to CSV while trimming rows from top and/or bottom.
+    
+    Args:
+        input_file (str): Path to input XLSX file
+        output_file (str): Path to output CSV file (optional)
+        skip_rows (int): Number of rows to skip from the top (default: 4 for PRIV files)
+        skip_footer (int): Number of rows to skip from the bottom
+        sheet_name (str/int): Sheet name or index to convert (default: 0)
+    
+    Returns:
+        str: Path to the created CSV file, or None if conversion failed
+    """
+    
+    loaded = load_xlsx_dataframe(input_file, skip_rows, skip_footer, sheet_name)
+    if loaded is None:
+        return None
+    df, extracted_date, b2_value = loaded
+    
+    try:
+        # Generate output filename if not provided
+        if output_file is None:
+            output_file = xlsx_csv_filename(input_file, extracted_date, b2_value)
         
         # Convert to CSV
         print(f"Converting to CSV: {output_file}")
@@ -425,94 +534,50 @@ def convert_xlsx_to_csv(input_file, output_file=None, skip_rows=4, skip_footer=3
         print(f"[ERROR] Error during conversion: {str(e)}")
         return None
 
-def sync_csv_to_db(csv_file, db_file):
+def ensure_holding_index(cursor):
     """
-    Sync CSV data to SQLite database, avoiding duplicate date/source combinations.
+    Create the unique index that identifies one holding per date/source, so duplicate
+    rows are rejected by SQLite in the b-tree instead of filtered in Python.
     
     Args:
-        csv_file (str): Path to CSV file
-        db_file (str): Path to SQLite database file
+        cursor (sqlite3.Cursor): Cursor on the database containing financial_data
     """
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_financial_data_holding "
+        "ON financial_data (date, source_identifier, identifier, name)"
+    )
+
+def check_sync_columns(columns):
+    """
+    Check normalized input columns against the financial_data schema.
     
-    # Check if CSV file exists
-    if not os.path.exists(csv_file):
-        print(f"Error: CSV file '{csv_file}' not found.")
-        return False
-    
-    # Load CSV
-    print(f"Loading CSV file: {csv_file}")
-    df = pd.read_csv(csv_file)
-    
-    # Print original column names for debugging
-    print("Original column names:")
-    for i, col in enumerate(df.columns):
-        print(f"  [{i}]: '{col}'")
-    
-    # Ensure column names match DB
-    original_columns = df.columns.tolist()
-    df.columns = [col.lower().replace(" ", "_") for col in df.columns]
+    Args:
+        columns (list): Normalized column names of the input
     
-    # Print normalized column names for debugging
-    print("Normalized column names:")
-    for i, col in enumerate(df.columns):
-        print(f"  [{i}]: '{col}' (was: '{original_columns[i]}')")
+    Returns:
+        list: Expected columns present in the input, or None if a required column is missing
+    """
     
     # Check if 'date' column exists after normalization
-    if 'date' not in df.columns:
+    if 'date' not in columns:
         print("[ERROR] ERROR: No 'date' column found after normalization!")
-        print("Available columns:", list(df.columns))
+        print("Available columns:", columns)
         
         # Try to find a date-like column
-        possible_date_columns = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower() or 'as_of' in col.lower()]
+        possible_date_columns = [col for col in columns if 'date' in col.lower() or 'time' in col.lower() or 'as_of' in col.lower()]
         if possible_date_columns:
             print(f"Possible date columns found: {possible_date_columns}")
             print("You may need to rename one of these columns to 'date' or adjust the column mapping.")
         else:
             print("No obvious date columns found. Please check your source file structure.")
         
-        return False
+        return None
     
     # Check if 'source_identifier' column exists after normalization
-    if 'source_identifier' not in df.columns:
+    if 'source_identifier' not in columns:
         print("[ERROR] ERROR: No 'source_identifier' column found after normalization!")
-        print("Available columns:", list(df.columns))
-        return False
-    
-    # Extract all unique date/source combinations in the file
-    csv_combinations = df[["date", "source_identifier"]].dropna().drop_duplicates()
-    print(f"Found {len(csv_combinations)} unique date/source combinations in CSV:")
-    for _, row in csv_combinations.iterrows():
-        print(f"  {row['date']} - {row['source_identifier']}")
-    
-    # Connect to DB
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    
-    # Check if the financial_data table exists and get existing date/source combinations
-    try:
-        existing_combinations = cursor.execute("SELECT DISTINCT date, source_identifier FROM financial_data").fetchall()
-        existing_combinations = set((combo[0], combo[1]) for combo in existing_combinations)
-        print(f"Found {len(existing_combinations)} existing date/source combinations in database")
-    except sqlite3.OperationalError as e:
-        if "no such table" in str(e):
-            print("Table 'financial_data' doesn't exist yet. All data will be inserted as new.")
-            existing_combinations = set()
-        else:
-            raise e
-    
-    # Filter out rows with already existing date/source combinations
-    def is_new_combination(row):
-        return (row['date'], row['source_identifier']) not in existing_combinations
-    
-    new_data_mask = df.apply(is_new_combination, axis=1)
-    df_new = df[new_data_mask]
-    
-    if df_new.empty:
-        print("All date/source combinations in this CSV already exist in the database. No new data inserted.")
-        conn.close()
-        return True
-    
-    print(f"Found {len(df_new)} rows with new date/source combinations to insert")
+        print("Available columns:", columns)
+        return None
     
     # Expected columns for the database (updated to include source_identifier)
     expected_columns = [
@@ -521,28 +586,288 @@ def sync_csv_to_db(csv_file, db_file):
     ]
     
     # Check which expected columns are missing
-    missing_columns = [col for col in expected_columns if col not in df_new.columns]
+    missing_columns = [col for col in expected_columns if col not in columns]
     if missing_columns:
         print(f"WARNING: Missing expected columns: {missing_columns}")
-        print("Available columns:", list(df_new.columns))
+        print("Available columns:", columns)
         
         # Only use columns that exist
-        available_columns = [col for col in expected_columns if col in df_new.columns]
+        available_columns = [col for col in expected_columns if col in columns]
         print(f"Using available columns: {available_columns}")
     else:
         available_columns = expected_columns
     
-    # Insert remaining new rows
+    return available_columns
+
+def connect_for_sync(db_file):
+    """
+    Open a SQLite connection tuned for bulk writes with SQLITE_WRITE_PRAGMAS.
+    
+    Args:
+        db_file (str): Path to SQLite database file
+    
+    Returns:
+        sqlite3.Connection: Connection to the database
+    """
+    # A pragma that can't be set (e.g. journal_mode while another connection holds a lock)
+    # just leaves SQLite's default in place
+    conn = sqlite3.connect(db_file)
+    for pragma in SQLITE_WRITE_PRAGMAS:
+        try:
+            conn.execute(f"PRAGMA {pragma}")
+        except sqlite3.OperationalError as e:
+            print(f"WARNING: Could not apply PRAGMA {pragma}: {e}")
+    return conn
+
+def checkpoint_wal(conn):
+    """
+    Copy committed WAL pages into the main database file and truncate the WAL.
+    
+    Readers that detect changes from the database file (the dashboard's read-only
+    connection cannot checkpoint) then see each sync. A checkpoint that can't run
+    just leaves the pages in the WAL for a later one.
+    
+    Args:
+        conn (sqlite3.Connection): Connection with no open transaction
+    """
     try:
-        df_new[available_columns].to_sql("financial_data", conn, if_exists="append", index=False)
-        conn.close()
-        
-        print(f"[SUCCESS] Inserted {len(df_new)} new rows into the database.")
-        return True
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.OperationalError as e:
+        print(f"WARNING: Could not checkpoint WAL: {e}")
+
+def insert_holdings(chunks, columns, available_columns, db_file, source_label="CSV", conn=None):
+    """
+    Insert holdings into financial_data, skipping those already stored for the same date/source.
+    
+    Args:
+        chunks (iterable): DataFrames holding the input rows
+        columns (list): Normalized column names applied to each chunk
+        available_columns (list): Columns to insert, as returned by check_sync_columns
+        db_file (str): Path to SQLite database file
+        source_label (str): Name of the input kind used in progress messages (default: "CSV")
+        conn (sqlite3.Connection): Shared connection from connect_for_sync (optional; the
+            caller keeps ownership, checkpoints and closes it)
+    """
+    
+    # Open our own tuned connection unless the caller shares one
+    own_conn = conn is None
+    if own_conn:
+        conn = connect_for_sync(db_file)
+    cursor = conn.cursor()
+    
+    # Check if the financial_data table exists
+    table_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'financial_data'"
+    ).fetchone() is not None
+    if table_exists:
+        try:
+            ensure_holding_index(cursor)
+        except sqlite3.IntegrityError:
+            print("[ERROR] Cannot create unique holding index: 'financial_data' already contains duplicate holdings.")
+            if own_conn:
+                conn.close()
+            return False
+        except sqlite3.OperationalError as e:
+            print(f"[ERROR] Cannot create unique holding index: {str(e)}")
+            if own_conn:
+                conn.close()
+            return False
+    else:
+        print("Table 'financial_data' doesn't exist yet. All data will be inserted as new.")
+    
+    # INSERT OR IGNORE lets the unique index skip holdings that are already stored
+    column_list = ", ".join(available_columns)
+    placeholders = ", ".join("?" * len(available_columns))
+    insert_sql = f"INSERT OR IGNORE INTO financial_data ({column_list}) VALUES ({placeholders})"
+    
+    # Insert chunk by chunk with one prepared statement inside a single transaction,
+    # so peak memory is bounded by the chunk size rather than the file size
+    combinations = {}
+    rows_inserted = 0
+    try:
+        with conn:
+            # Take the write lock up front so the whole file commits (and fsyncs) once,
+            # rather than relying on the implicit deferred BEGIN at the first insert
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+                if list(chunk.columns) != columns:
+                    chunk = chunk.set_axis(columns, axis=1)
+                
+                # Track unique date/source combinations in the input (in order of appearance)
+                for combo in chunk[["date", "source_identifier"]].dropna().drop_duplicates().itertuples(index=False, name=None):
+                    combinations.setdefault(combo, None)
+                
+                # Reorder/trim to the insert columns unless the input already matches them
+                if columns != available_columns:
+                    chunk = chunk[available_columns]
+                
+                if not table_exists:
+                    # Let pandas create the table schema from the column dtypes
+                    chunk.head(0).to_sql("financial_data", conn, index=False)
+                    ensure_holding_index(cursor)
+                    table_exists = True
+                
+                # to_records().tolist() unboxes each column to Python values in C, which is
+                # much cheaper than itertuples on the string-typed columns
+                cursor.executemany(insert_sql, chunk.to_records(index=False).tolist())
+                rows_inserted += cursor.rowcount
     except Exception as e:
         print(f"[ERROR] Error inserting data into database: {str(e)}")
+        if own_conn:
+            conn.close()
+        return False
+    if own_conn:
+        checkpoint_wal(conn)
         conn.close()
+    
+    print(f"Found {len(combinations)} unique date/source combinations in {source_label}:")
+    for combo_date, combo_source in combinations:
+        print(f"  {combo_date} - {combo_source}")
+    
+    if rows_inserted == 0:
+        print(f"All holdings in this {source_label} already exist in the database. No new data inserted.")
+        return True
+    
+    print(f"[SUCCESS] Inserted {rows_inserted} new rows into the database.")
+    return True
+
+def sync_csv_to_db(csv_file, db_file, chunk_size=CSV_CHUNK_SIZE, conn=None):
+    """
+    Sync CSV data to SQLite database, skipping holdings already stored for the same date/source.
+    
+    Args:
+        csv_file (str): Path to CSV file
+        db_file (str): Path to SQLite database file
+        chunk_size (int): Rows read and inserted per executemany batch (default: CSV_CHUNK_SIZE)
+        conn (sqlite3.Connection): Shared connection from connect_for_sync (optional)
+    """
+    
+    # Check if CSV file exists
+    if not os.path.exists(csv_file):
+        print(f"Error: CSV file '{csv_file}' not found.")
+        return False
+    
+    # Load only the CSV header here; rows are streamed in chunks during the insert
+    print(f"Loading CSV file: {csv_file}")
+    original_columns = pd.read_csv(csv_file, nrows=0).columns.tolist()
+    
+    # CSVs written by the converters above already use DB column names; normalize anything else
+    columns = normalize_columns(original_columns)
+    if columns != original_columns:
+        print(f"Normalized column names: {original_columns} -> {columns}")
+    else:
+        print(f"Columns: {columns}")
+    
+    available_columns = check_sync_columns(columns)
+    if available_columns is None:
         return False
+    
+    # Only parse the columns that get inserted, and declare the TEXT ones up front
+    # instead of letting each chunk infer them
+    use_columns = [original for original, column in zip(original_columns, columns) if column in available_columns]
+    columns = [column for column in columns if column in available_columns]
+    text_dtypes = {
+        original: str for original, column in zip(use_columns, columns) if column in TEXT_COLUMNS
+    }
+    
+    chunks = pd.read_csv(csv_file, usecols=use_columns, dtype=text_dtypes, chunksize=chunk_size)
+    return insert_holdings(chunks, columns, available_columns, db_file, conn=conn)
+
+def sync_dataframe_to_db(df, db_file, conn=None):
+    """
+    Sync an in-memory holdings table (e.g. from load_xlsx_dataframe) to SQLite database,
+    skipping holdings already stored for the same date/source.
+    
+    Args:
+        df (pd.DataFrame): Holdings table
+        db_file (str): Path to SQLite database file
+        conn (sqlite3.Connection): Shared connection from connect_for_sync (optional)
+    """
+    
+    columns = normalize_columns(df.columns)
+    print(f"Columns: {columns}")
+    
+    available_columns = check_sync_columns(columns)
+    if available_columns is None:
+        return False
+    
+    return insert_holdings([df], columns, available_columns, db_file, source_label="file", conn=conn)
+
+# =============================================================================
+# FILE SYNC
+# =============================================================================
+
+def sync_file(input_file, db_file, skip_rows=4, skip_footer=37, sheet_name=0, write_csv=True,
+              invesco=False, keep_invesco=False, ticker="HIYS", chunk_size=CSV_CHUNK_SIZE, conn=None):
+    """
+    Sync one CSV, XLSX or raw Invesco file into the database (the work behind the CLI,
+    importable so callers like update_database.py don't need a subprocess per file).
+    
+    Args:
+        input_file (str): Path to input CSV, XLSX or Invesco CSV file
+        db_file (str): Path to SQLite database file
+        skip_rows (int): Number of rows to skip from top (XLSX only)
+        skip_footer (int): Number of rows to skip from bottom (XLSX only)
+        sheet_name (str/int): Sheet name or index to load (XLSX only)
+        write_csv (bool): Write the processed MMDDYYYY<SOURCE>.csv copy (XLSX only)
+        invesco (bool): Process as a raw Invesco CSV file
+        keep_invesco (bool): Keep the raw Invesco file after a successful sync
+        ticker (str): Invesco ETF ticker symbol for source identification
+        chunk_size (int): Rows read and inserted per batch when syncing a CSV
+        conn (sqlite3.Connection): Shared connection from connect_for_sync, so a caller
+            syncing several files opens and tunes the database once (optional)
+    
+    Returns:
+        bool: True if the sync succeeded, False otherwise
+    """
+    csv_file = input_file
+    xlsx_df = None
+
+    # Check if processing Invesco file
+    if invesco:
+        print(f"Invesco mode enabled. Processing Invesco CSV file for ticker: {ticker}...")
+        csv_file = convert_invesco_csv(input_file, ticker=ticker)
+        if csv_file is None:
+            print("[ERROR] Failed to process Invesco file.")
+            return False
+        print()
+    # Check if input file is XLSX
+    elif input_file.lower().endswith(('.xlsx', '.xls')):
+        print("XLSX file detected. Loading holdings table...")
+        loaded = load_xlsx_dataframe(
+            input_file=input_file,
+            skip_rows=skip_rows,
+            skip_footer=skip_footer,
+            sheet_name=sheet_name
+        )
+        if loaded is None:
+            print("[ERROR] Failed to load XLSX file.")
+            return False
+        xlsx_df, extracted_date, b2_value = loaded
+        
+        # Keep the processed MMDDYYYY<SOURCE>.csv copy unless asked not to;
+        # the sync itself reads the in-memory table, not this file
+        if write_csv:
+            csv_file = xlsx_csv_filename(input_file, extracted_date, b2_value)
+            print(f"Writing processed CSV: {csv_file}")
+            xlsx_df.to_csv(csv_file, index=False)
+        print()
+
+    # Sync to database (straight from the loaded table for XLSX input)
+    if xlsx_df is not None:
+        success = sync_dataframe_to_db(xlsx_df, db_file, conn=conn)
+    else:
+        success = sync_csv_to_db(csv_file, db_file, chunk_size=chunk_size, conn=conn)
+
+    # Clean up original Invesco file after successful processing
+    if invesco and success and not keep_invesco:
+        if input_file != csv_file:  # Don't delete if input and output are the same
+            delete_invesco_file(input_file)
+
+    return success
 
 def main():
     parser = argparse.ArgumentParser(description="Sync CSV/XLSX data to SQLite database")
@@ -555,14 +880,18 @@ def main():
                        help="Number of rows to skip from bottom (XLSX only, default: 37)")
     parser.add_argument("-w", "--sheet", default=0, 
                        help="Sheet name or index to convert (XLSX only)")
-    parser.add_argument("--keep-csv", action="store_true", 
-                       help="Keep converted CSV file (don't delete after processing)")
+    parser.add_argument("--keep-csv", action="store_true",
+                       help="Deprecated, no effect: the processed CSV copy is always kept unless --no-csv is given")
+    parser.add_argument("--no-csv", action="store_true",
+                       help="Don't write the processed CSV copy of an XLSX file (XLSX only)")
     parser.add_argument("--invesco", action="store_true",
                        help="Process as Invesco CSV file (extract AP Grange Holdings LLC)")
     parser.add_argument("--keep-invesco", action="store_true",
                        help="Keep original Invesco file after processing (don't delete)")
     parser.add_argument("--ticker", default="HIYS",
                        help="Invesco ETF ticker symbol for source identification (default: HIYS). Options: HIYS, GTO, GTOC")
+    parser.add_argument("-c", "--chunk-size", type=int, default=CSV_CHUNK_SIZE,
+                       help=f"Rows read and inserted per batch when syncing the CSV (default: {CSV_CHUNK_SIZE})")
     args = parser.parse_args()
 
     # --- New: Download if requested ---
@@ -575,47 +904,23 @@ def main():
     else:
         input_file = args.input_file
 
-    db_file = args.database
-    csv_file = input_file
-    temp_csv_created = False
-
-    # Check if processing Invesco file
-    if args.invesco:
-        print(f"Invesco mode enabled. Processing Invesco CSV file for ticker: {args.ticker}...")
-        csv_file = convert_invesco_csv(input_file, ticker=args.ticker)
-        if csv_file is None:
-            print("[ERROR] Failed to process Invesco file. Exiting.")
-            sys.exit(1)
-        temp_csv_created = True
-        print()
-    # Check if input file is XLSX
-    elif input_file.lower().endswith(('.xlsx', '.xls')):
-        print("XLSX file detected. Converting to CSV first...")
-        try:
-            sheet_name = int(args.sheet)
-        except ValueError:
-            sheet_name = args.sheet
-        csv_file = convert_xlsx_to_csv(
-            input_file=input_file,
-            skip_rows=args.skip_rows,
-            skip_footer=args.skip_footer,
-            sheet_name=sheet_name
-        )
-        if csv_file is None:
-            print("[ERROR] Failed to convert XLSX file. Exiting.")
-            sys.exit(1)
-        temp_csv_created = True
-        print()
-
-    # Sync CSV to database
-    success = sync_csv_to_db(csv_file, db_file)
-
-    # Clean up temporary CSV file if it was created and not requested to keep
+    try:
+        sheet_name = int(args.sheet)
+    except ValueError:
+        sheet_name = args.sheet
 
-    # Clean up original Invesco file after successful processing
-    if args.invesco and success and not args.keep_invesco:
-        if input_file != csv_file:  # Don't delete if input and output are the same
-            delete_invesco_file(input_file)
+    success = sync_file(
+        input_file,
+        args.database,
+        skip_rows=args.skip_rows,
+        skip_footer=args.skip_footer,
+        sheet_name=sheet_name,
+        write_csv=not args.no_csv,
+        invesco=args.invesco,
+        keep_invesco=args.keep_invesco,
+        ticker=args.ticker,
+        chunk_size=args.chunk_size
+    )
 
     if not success:
         sys.exit(1)
@@ -19,10 +19,13 @@ Exit codes:
 import subprocess
 import sys
 import os
-import glob
 import argparse
+import re
+import time
 from datetime import datetime
 
+from sync_csv_to_db import checkpoint_wal, connect_for_sync, sync_file
+
 
 # =============================================================================
 # CONFIGURATION
@@ -42,12 +45,22 @@ INVESCO_FILES = {
     "GTOC": "invesco_core_fixed_income_etf-monthly_holdings.csv"
 }
 
+# Filename fragments used to match an Invesco download to its ticker when the
+# expected filename isn't present
+INVESCO_TICKER_PATTERNS = {
+    "GTO": ["total_return_bond", "gto"],
+    "GTOC": ["core_fixed_income", "gtoc"]
+}
+
 # All valid source names (for --only flag)
 ALL_SOURCES = list(SSGA_FILES.keys()) + INVESCO_TICKERS  # ["PRIV", "PRSD", "GTO", "GTOC"]
 
 # Database configuration
 DEFAULT_DB = "priv_data.db"
 
+# Processed CSV filenames: 8 digits followed by uppercase letters, then .csv (e.g. 01072026GTO.csv)
+PROCESSED_CSV_PATTERN = re.compile(r'^\d{8}[A-Z]+\.csv$')
+
 
 # =============================================================================
 # HELPER FUNCTIONS
@@ -72,47 +85,64 @@ def print_status(message, status="info"):
     print(f"{symbol} {message}")
 
 
+def list_dir_files():
+    """
+    List the regular, non-hidden files in the current directory with a single os.scandir
+    pass; is_file() reuses the scan's cached file type instead of a stat per entry.
+    """
+    with os.scandir(".") as entries:
+        return [entry.name for entry in entries if not entry.name.startswith(".") and entry.is_file()]
+
+
+def list_csv_files(dir_files=None):
+    """
+    List the CSV files in the current directory, like glob.glob("*.csv") (hidden files
+    skipped, platform case rules for the extension) but regular files only.
+
+    Args:
+        dir_files: Names from list_dir_files() to filter, or None to scan here.
+    """
+    if dir_files is None:
+        dir_files = list_dir_files()
+    return [name for name in dir_files if os.path.normcase(name).endswith(".csv")]
+
+
 def find_invesco_csv_files():
     """Find all downloaded Invesco CSV files in the current directory."""
-    csv_files = glob.glob("*.csv")
+    csv_files = list_csv_files()
     # Filter out processed files (MMDDYYYYTICKER.csv format)
-    invesco_files = []
-    for f in csv_files:
-        # Look for files that don't match the processed format
-        # Invesco raw files typically have format like "HIYS_holdings_YYYY-MM-DD.csv"
-        # or just ticker-related names
-        basename = os.path.basename(f)
-        # Skip if it matches our processed format (MMDDYYYYTICKER.csv)
-        if not (len(basename) >= 12 and basename[:8].isdigit() and
-                basename[8:12].replace('.csv', '').isupper()):
-            invesco_files.append(f)
-    return invesco_files
-
-
-def verify_files_exist(selected_sources=None):
+    # Invesco raw files typically have format like "HIYS_holdings_YYYY-MM-DD.csv"
+    # or just ticker-related names
+    return [f for f in csv_files if not PROCESSED_CSV_PATTERN.match(os.path.basename(f))]
+
+
+def verify_files_exist(selected_sources=None, dir_files=None):
     """
     Verify all expected files exist after download.
 
     Args:
         selected_sources: Set of source names to check, or None for all.
+        dir_files: Names from list_dir_files() to check against, or None to stat each file.
 
     Returns:
         tuple: (success: bool, missing_files: list)
     """
     missing = []
+    # Set membership against the directory scan, or a stat per file without one
+    file_exists = set(dir_files).__contains__ if dir_files is not None else os.path.exists
 
     # Check SSGA files
     for name, filename in SSGA_FILES.items():
         if selected_sources and name not in selected_sources:
             continue
-        if not os.path.exists(filename):
+        if not file_exists(filename):
             missing.append(f"SSGA {name}: {filename}")
 
     # Check Invesco files - check for exact filenames
     for ticker, filename in INVESCO_FILES.items():
         if selected_sources and ticker not in selected_sources:
             continue
-        if not os.path.exists(filename):
+        if not file_exists(filename):
             missing.append(f"Invesco {ticker}: {filename}")
 
     return (len(missing) == 0, missing)
@@ -122,30 +152,31 @@ def verify_files_exist(selected_sources=None):
 # MAIN WORKFLOW STEPS
 # =============================================================================
 
-def step1_download_files():
+def step1_download_files(selected_sources=None):
     """
     Step 1: Run WebSitechecker to download all files.
 
+    Args:
+        selected_sources: Set of source names to download, or None for all.
+
     Returns:
         bool: True if download succeeded, False otherwise
     """
     print_section("STEP 1: Downloading Files")
 
     try:
+        # Let WebSitechecker write straight to our stdout/stderr as it runs instead of
+        # buffering its whole output and re-printing it afterwards
+        sys.stdout.flush()
+        command = ["python", "WebSitechecker.py"]
+        if selected_sources and set(selected_sources) != set(ALL_SOURCES):
+            # Only fetch what will be processed (no browser at all without Invesco tickers)
+            command += sorted(selected_sources)
         result = subprocess.run(
-            ["python", "WebSitechecker.py"],
-            capture_output=True,
-            text=True,
+            command,
             timeout=300  # 5 minute timeout
         )
 
-        # Print the output from WebSitechecker
-        print(result.stdout)
-
-        if result.stderr:
-            print("Errors/Warnings:")
-            print(result.stderr)
-
         if result.returncode != 0:
             print_status("WebSitechecker failed with non-zero exit code", "error")
             return False
@@ -161,25 +192,29 @@ def step1_download_files():
         return False
 
 
-def step2_verify_files(selected_sources=None):
+def step2_verify_files(selected_sources=None, dir_files=None):
     """
     Step 2: Verify all expected files are present.
 
     Args:
         selected_sources: Set of source names to verify, or None for all.
+        dir_files: Names from list_dir_files(), or None to scan the directory here.
 
     Returns:
         bool: True if all files present, False otherwise
     """
     print_section("STEP 2: Verifying Downloaded Files")
 
-    success, missing = verify_files_exist(selected_sources)
+    if dir_files is None:
+        dir_files = list_dir_files()
+
+    success, missing = verify_files_exist(selected_sources, dir_files)
 
     if success:
         print_status("All expected SSGA files found", "success")
 
         # List found CSV files
-        csv_files = glob.glob("*.csv")
+        csv_files = list_csv_files(dir_files)
         if csv_files:
             print_status(f"Found {len(csv_files)} CSV file(s) (Invesco)", "success")
             for f in csv_files[:5]:  # Show first 5
@@ -194,13 +229,14 @@ def step2_verify_files(selected_sources=None):
         return False
 
 
-def step3_process_ssga_files(db_file, selected_sources=None):
+def step3_process_ssga_files(db_file, selected_sources=None, conn=None):
     """
     Step 3: Process SSGA XLSX files and sync to database.
 
     Args:
         db_file: Path to database file
         selected_sources: Set of source names to process, or None for all.
+        conn: Shared connection from connect_for_sync, or None to open one per file.
 
     Returns:
         bool: True if all selected SSGA files processed successfully
@@ -215,28 +251,12 @@ def step3_process_ssga_files(db_file, selected_sources=None):
         print(f"\n--- Processing {name} ---")
 
         try:
-            result = subprocess.run(
-                ["python", "sync_csv_to_db.py", filename, "-d", db_file],
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-
-            print(result.stdout)
-
-            if result.stderr:
-                print("Warnings/Errors:")
-                print(result.stderr)
-
-            if result.returncode != 0:
+            if not sync_file(filename, db_file, conn=conn):
                 print_status(f"Failed to process {name}", "error")
                 all_success = False
             else:
                 print_status(f"Successfully processed {name}", "success")
 
-        except subprocess.TimeoutExpired:
-            print_status(f"Processing {name} timed out", "error")
-            all_success = False
         except Exception as e:
             print_status(f"Error processing {name}: {e}", "error")
             all_success = False
@@ -274,21 +294,19 @@ def is_processed_csv(filename):
     Returns:
         bool: True if the file matches the processed format
     """
-    import re
     basename = os.path.basename(filename)
-    # Match pattern: 8 digits followed by uppercase letters, then .csv
-    # Example: 01072026GTO.csv
-    pattern = r'^\d{8}[A-Z]+\.csv$'
-    return bool(re.match(pattern, basename))
+    return bool(PROCESSED_CSV_PATTERN.match(basename))
 
 
-def step4_process_invesco_files(db_file, selected_sources=None):
+def step4_process_invesco_files(db_file, selected_sources=None, all_csv_files=None, conn=None):
     """
     Step 4: Process Invesco CSV files and sync to database.
 
     Args:
         db_file: Path to database file
         selected_sources: Set of source names to process, or None for all.
+        all_csv_files: CSV files in the working directory, or None to list them here.
+        conn: Shared connection from connect_for_sync, or None to open one per file.
 
     Returns:
         bool: True if all selected Invesco files processed successfully
@@ -296,7 +314,8 @@ def step4_process_invesco_files(db_file, selected_sources=None):
     print_section("STEP 4: Processing Invesco Files")
 
     # Find all CSV files (Invesco downloads)
-    all_csv_files = glob.glob("*.csv")
+    if all_csv_files is None:
+        all_csv_files = list_csv_files()
 
     # Filter to only Invesco download files
     csv_files = [f for f in all_csv_files if is_invesco_download(f)]
@@ -314,87 +333,49 @@ def step4_process_invesco_files(db_file, selected_sources=None):
     all_success = True
     processed_count = 0
 
-    # Track which raw files we've used
-    raw_files_by_ticker = {}
-
-    # We need to match CSV files to tickers
-    # Since WebSitechecker may produce files with variable names,
-    # we'll process each ticker and let it find the appropriate file
-
     tickers_to_process = [t for t in INVESCO_TICKERS if not selected_sources or t in selected_sources]
 
     if not tickers_to_process:
         print_status("No Invesco tickers selected for processing", "info")
         return True
 
+    # Match each ticker to its own download up front: the expected filename first, then
+    # the filename patterns. A ticker without a match is reported, never given some other
+    # unused file, so one fund's holdings can't be synced under another fund's ticker.
+    lowered_names = {f: f.lower() for f in csv_files}
+    files_by_ticker = {}
+    for ticker in tickers_to_process:
+        expected_filename = INVESCO_FILES.get(ticker)
+        if expected_filename and expected_filename in lowered_names:
+            candidates = [expected_filename]
+        else:
+            patterns = INVESCO_TICKER_PATTERNS.get(ticker, [ticker.lower()])
+            candidates = [f for f in csv_files if any(pattern in lowered_names[f] for pattern in patterns)]
+        assigned = set(files_by_ticker.values())
+        candidates = [f for f in candidates if f not in assigned]
+        if candidates:
+            files_by_ticker[ticker] = candidates[0]  # Process only the first match
+
     for ticker in tickers_to_process:
         print(f"\n--- Processing {ticker} ---")
 
-        # Find CSV file that corresponds to this ticker
-        # First, try to find the exact expected filename
-        expected_filename = INVESCO_FILES.get(ticker)
-        matching_files = []
+        csv_file = files_by_ticker.get(ticker)
+        if csv_file is None:
+            print_status(f"No CSV file found for ticker {ticker}", "error")
+            all_success = False
+            continue
 
-        if expected_filename and expected_filename in csv_files:
-            matching_files.append(expected_filename)
-        else:
-            # Fallback: search by patterns in filename
-            ticker_patterns = {
-                "GTO": ["total_return_bond", "gto"],
-                "GTOC": ["core_fixed_income", "gtoc"]
-            }
-            patterns = ticker_patterns.get(ticker, [ticker.lower()])
-
-            for csv_file in csv_files:
-                csv_lower = csv_file.lower()
-                if any(pattern in csv_lower for pattern in patterns):
-                    matching_files.append(csv_file)
-
-        if not matching_files:
-            print_status(f"No CSV file found for ticker {ticker}", "warning")
-            # Try to find any unprocessed CSV that hasn't been used yet
-            unused_files = [f for f in csv_files if f not in raw_files_by_ticker.values()]
-            if unused_files:
-                matching_files = [unused_files[0]]
-                print_status(f"Attempting to process {matching_files[0]} as {ticker}", "info")
-            else:
-                print_status(f"No unused Invesco files available for {ticker}", "error")
-                all_success = False
-                continue
-
-        for csv_file in matching_files[:1]:  # Process only the first match
-            try:
-                result = subprocess.run(
-                    ["python", "sync_csv_to_db.py", csv_file,
-                     "-d", db_file, "--invesco", "--ticker", ticker],
-                    capture_output=True,
-                    text=True,
-                    timeout=120
-                )
-
-                print(result.stdout)
-
-                if result.stderr:
-                    print("Warnings/Errors:")
-                    print(result.stderr)
-
-                if result.returncode != 0:
-                    print_status(f"Failed to process {ticker}", "error")
-                    all_success = False
-                else:
-                    print_status(f"Successfully processed {ticker}", "success")
-                    processed_count += 1
-                    # Track which raw file was used for this ticker
-                    raw_files_by_ticker[ticker] = csv_file
-                    # Remove from list to avoid reprocessing
-                    csv_files.remove(csv_file)
-
-            except subprocess.TimeoutExpired:
-                print_status(f"Processing {ticker} timed out", "error")
-                all_success = False
-            except Exception as e:
-                print_status(f"Error processing {ticker}: {e}", "error")
+        try:
+            if not sync_file(csv_file, db_file, invesco=True, ticker=ticker, conn=conn):
+                print_status(f"Failed to process {ticker}", "error")
                 all_success = False
+            else:
+                print_status(f"Successfully processed {ticker}", "success")
+                processed_count += 1
+
+        except Exception as e:
+            print_status(f"Error processing {ticker}: {e}", "error")
+            all_success = False
 
     print(f"\nProcessed {processed_count}/{len(tickers_to_process)} Invesco tickers")
 
@@ -424,7 +405,8 @@ def step5_cleanup(keep_files):
     # SSGA CSV files (converted from XLSX, these have MMDDYYYYSOURCE.csv format)
     # We keep these as they're the processed output
     # Only remove raw Invesco CSV downloads (not the processed MMDDYYYYTICKER.csv files)
-    all_csv_files = glob.glob("*.csv")
+    # Listed fresh: steps 3 and 4 add processed CSVs and may delete raw Invesco files
+    all_csv_files = list_csv_files()
     for csv_file in all_csv_files:
         # Only remove raw Invesco downloads (files that are NOT in processed format)
         if not is_processed_csv(csv_file):
@@ -483,6 +465,7 @@ def main():
     selected_sources = set(args.only) if args.only else set(ALL_SOURCES)
 
     start_time = datetime.now()
+    start_clock = time.monotonic()  # Duration clock, unaffected by wall-clock adjustments
 
     print("="*80)
     print("  DATABASE UPDATE WORKFLOW")
@@ -496,44 +479,56 @@ def main():
 
     # Step 1: Download files
     if not args.skip_download:
-        if not step1_download_files():
+        if not step1_download_files(selected_sources):
             print_status("Download failed. Aborting workflow.", "error")
             sys.exit(1)
     else:
         print_section("STEP 1: Downloading Files (SKIPPED)")
         print_status("Using existing files", "info")
 
+    # Scan the directory once after downloading; steps 2 and 4 share this listing
+    # (step 3 only adds processed MMDDYYYYSOURCE.csv files, which step 4 ignores)
+    dir_files = list_dir_files()
+    all_csv_files = list_csv_files(dir_files)
+
     # Step 2: Verify files
-    if not step2_verify_files(selected_sources):
+    if not step2_verify_files(selected_sources, dir_files):
         print_status("File verification failed. Aborting workflow.", "error")
         sys.exit(1)
 
-    # Step 3: Process SSGA files (skip if no SSGA sources selected)
-    ssga_selected = selected_sources & set(SSGA_FILES.keys())
-    if ssga_selected:
-        if not step3_process_ssga_files(args.database, selected_sources):
-            print_status("SSGA processing encountered errors", "warning")
-            success = False
-    else:
-        print_section("STEP 3: Processing SSGA Files (SKIPPED)")
-        print_status("No SSGA sources selected", "info")
-
-    # Step 4: Process Invesco files (skip if no Invesco sources selected)
-    invesco_selected = selected_sources & set(INVESCO_TICKERS)
-    if invesco_selected:
-        if not step4_process_invesco_files(args.database, selected_sources):
-            print_status("Invesco processing encountered errors", "warning")
-            success = False
-    else:
-        print_section("STEP 4: Processing Invesco Files (SKIPPED)")
-        print_status("No Invesco sources selected", "info")
+    # One tuned connection shared by every file synced in steps 3 and 4
+    conn = connect_for_sync(args.database)
+    try:
+        # Step 3: Process SSGA files (skip if no SSGA sources selected)
+        ssga_selected = selected_sources & set(SSGA_FILES.keys())
+        if ssga_selected:
+            if not step3_process_ssga_files(args.database, selected_sources, conn):
+                print_status("SSGA processing encountered errors", "warning")
+                success = False
+        else:
+            print_section("STEP 3: Processing SSGA Files (SKIPPED)")
+            print_status("No SSGA sources selected", "info")
+
+        # Step 4: Process Invesco files (skip if no Invesco sources selected)
+        invesco_selected = selected_sources & set(INVESCO_TICKERS)
+        if invesco_selected:
+            if not step4_process_invesco_files(args.database, selected_sources, all_csv_files, conn):
+                print_status("Invesco processing encountered errors", "warning")
+                success = False
+        else:
+            print_section("STEP 4: Processing Invesco Files (SKIPPED)")
+            print_status("No Invesco sources selected", "info")
+    finally:
+        # Write the synced rows into the main file so mtime-based readers see them
+        checkpoint_wal(conn)
+        conn.close()
 
     # Step 5: Cleanup
     step5_cleanup(args.keep_files)
 
     # Final summary
     end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
+    duration = time.monotonic() - start_clock
 
     print_section("SUMMARY")
     print(f"Started:  {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -10,12 +10,17 @@ Usage:
     python weekly_asset_export_report.py --fund PRIV --format csv
 """
 
+import csv
+import hashlib
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import argparse
 import sys
 import os
+from collections import OrderedDict
+from pathlib import Path
 
 
 def find_database(default_name="priv_data.db"):
@@ -37,39 +42,182 @@ def find_database(default_name="priv_data.db"):
     return os.path.abspath(default_name)
 
 
-def load_fund_data(db_path, fund_symbol):
-    """Load all data for a specific fund from the database."""
-    conn = sqlite3.connect(db_path)
+SQLITE_READ_PRAGMAS = [
+    "query_only=1",
+    "cache_size=-65536",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+]
+
+# Per-fund, per-database Parquet snapshots of the last loaded date range
+SNAPSHOT_DIR = os.path.join("output", ".cache")
+
+REPORT_COLUMNS = [
+    "date", "name", "identifier", "par_value", "market_value", "weight",
+    "asset_breakdown",
+]
+
+
+def ensure_report_index(db_path):
+    """Create the (source_identifier, date) index the report queries rely on."""
     try:
-        df = pd.read_sql(
-            "SELECT * FROM financial_data WHERE source_identifier = ?",
-            conn,
-            params=(fund_symbol,),
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_financial_data_source_date "
+                "ON financial_data (source_identifier, date)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: could not create report index: {e}", file=sys.stderr)
+
+
+def _open_ro(db_path):
+    """Open a read-only SQLite connection tuned with SQLITE_READ_PRAGMAS."""
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    for pragma in SQLITE_READ_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def _db_stamp(db_path):
+    """Return a value that changes whenever the database or its WAL is written."""
+    stamp = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            st = os.stat(path)
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+def _query_fund_data(conn, fund_symbol, start_date, end_date):
+    """Query a fund's report columns for the dates between start_date and end_date."""
+    # Dates are stored as M/D/YYYY text, so they can't be range-compared
+    # in SQL; resolve the matching date strings first and fetch by those.
+    raw_dates = [
+        r[0]
+        for r in conn.execute(
+            "SELECT DISTINCT date FROM financial_data WHERE source_identifier = ?",
+            (fund_symbol,),
         )
-        df["date"] = pd.to_datetime(df["date"])
-        # Coerce numeric columns that may contain non-numeric strings
-        for col in ("par_value", "market_value", "weight"):
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-        return df
-    except Exception as e:
-        print(f"Error loading data for {fund_symbol}: {e}", file=sys.stderr)
+    ]
+    parsed = pd.to_datetime(raw_dates)
+    in_range = (parsed >= start_date) & (parsed <= end_date)
+    dates = [d for d, keep in zip(raw_dates, in_range) if keep]
+    if not dates:
         return pd.DataFrame()
-    finally:
-        conn.close()
+
+    placeholders = ", ".join("?" * len(dates))
+    df = pd.read_sql(
+        f"SELECT {', '.join(REPORT_COLUMNS)} FROM financial_data "
+        f"WHERE source_identifier = ? AND date IN ({placeholders})",
+        conn,
+        params=(fund_symbol, *dates),
+    )
+    df["date"] = pd.to_datetime(df["date"])
+    # Coerce numeric columns that may contain non-numeric strings; columns
+    # SQLite already returned as all-numeric are left as they are
+    for col in ("par_value", "market_value", "weight"):
+        if df[col].dtype.kind not in "fiu":
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    _add_key(df)
+    # A sorted DatetimeIndex turns the per-date lookups into binary searches
+    return df.set_index("date").sort_index(kind="stable")
 
 
-def get_available_dates(db_path, fund_symbol):
-    """Return sorted list of available dates for a fund."""
-    conn = sqlite3.connect(db_path)
+def _snapshot_path(db_path, fund_symbol):
+    """Return the fund's snapshot file for db_path; each database gets its own."""
+    db_hash = hashlib.sha1(str(Path(db_path).resolve()).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(SNAPSHOT_DIR, f"{fund_symbol}_{db_hash}.parquet")
+
+
+def _snapshot_source(db_path, date_range):
+    """Describe what a snapshot was built from, in the JSON-safe form attrs round-trip."""
+    return {
+        "db": str(Path(db_path).resolve()),
+        "db_stamp": [list(s) if s is not None else None for s in _db_stamp(db_path)],
+        "date_range": list(date_range),
+    }
+
+
+def _read_fund_snapshot(db_path, fund_symbol, date_range):
+    """Return the fund's Parquet snapshot if it was built from this exact DB state and date_range."""
     try:
-        rows = conn.execute(
-            "SELECT DISTINCT date FROM financial_data WHERE source_identifier = ?",
-            (fund_symbol,),
-        ).fetchall()
-        dates = sorted(pd.to_datetime([r[0] for r in rows]))
-        return dates
-    finally:
-        conn.close()
+        df = pd.read_parquet(
+            _snapshot_path(db_path, fund_symbol), engine="pyarrow", memory_map=True
+        )
+    except Exception:
+        return None
+    if df.attrs.pop("source", None) != _snapshot_source(db_path, date_range):
+        return None
+    return df
+
+
+def _write_fund_snapshot(df, db_path, fund_symbol, date_range):
+    """Save df as the fund's Parquet snapshot for db_path and date_range."""
+    snapshot = df.copy(deep=False)
+    snapshot.attrs["source"] = _snapshot_source(db_path, date_range)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        snapshot.to_parquet(
+            _snapshot_path(db_path, fund_symbol),
+            engine="pyarrow",
+            compression="zstd",
+        )
+    except Exception:
+        # Snapshot is only an accelerator; the next run just queries SQLite again
+        pass
+
+
+# Most recently used fund frames, keyed on (db, db stamp, fund, start, end).
+# A plain dict rather than functools.lru_cache so the caller's connection
+# isn't part of the key.
+FUND_DATA_CACHE_SIZE = 8
+_fund_data_cache = OrderedDict()
+
+
+def load_fund_data(db_path, fund_symbol, start_date, end_date, conn=None):
+    """
+    Load a fund's report columns for the dates between start_date and end_date.
+
+    Results are memoized in-process and snapshotted to Parquet under
+    SNAPSHOT_DIR until the database (or the --db path) changes.
+
+    Returns a DataFrame indexed by date (sorted), or an empty DataFrame.
+    """
+    date_range = (
+        pd.Timestamp(start_date).isoformat(),
+        pd.Timestamp(end_date).isoformat(),
+    )
+    key = (os.path.abspath(db_path), _db_stamp(db_path), fund_symbol, date_range)
+    if key in _fund_data_cache:
+        _fund_data_cache.move_to_end(key)
+        return _fund_data_cache[key].copy()
+
+    df = _read_fund_snapshot(db_path, fund_symbol, date_range)
+    if df is None:
+        own_conn = conn is None
+        if own_conn:
+            conn = _open_ro(db_path)
+        try:
+            df = _query_fund_data(conn, fund_symbol, start_date, end_date)
+        except Exception as e:
+            print(f"Error loading data for {fund_symbol}: {e}", file=sys.stderr)
+            return pd.DataFrame()
+        finally:
+            if own_conn:
+                conn.close()
+        if not df.empty:
+            _write_fund_snapshot(df, db_path, fund_symbol, date_range)
+
+    _fund_data_cache[key] = df
+    if len(_fund_data_cache) > FUND_DATA_CACHE_SIZE:
+        _fund_data_cache.popitem(last=False)
+    return df.copy()
 
 
 def resolve_boundary_dates(available_dates, start_date, end_date):
@@ -89,85 +237,70 @@ def resolve_boundary_dates(available_dates, start_date, end_date):
     return min(dates_in_range), max(dates_in_range)
 
 
-def composite_key(row):
-    """Return a stable identifier for an asset row."""
-    return row["name"] if row["identifier"] == "-" else row["identifier"]
+def _add_key(df):
+    """Add a _key column holding a stable identifier for each asset row."""
+    ident = df["identifier"].to_numpy()
+    name = df["name"].to_numpy()
+    df["_key"] = np.where(ident == "-", name, ident)
+
+
+def _compute_last_price(df):
+    """Return market value as a percentage of par, NaN where par is 0 or missing."""
+    pv = df["par_value"].to_numpy(dtype=float)
+    mv = df["market_value"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = mv / pv * 100
+    valid = (pv != 0) & ~np.isnan(pv)
+    # Python's round() keeps the published 4dp prices; np.round differs on ties
+    return np.array(
+        [round(x, 4) if ok else np.nan for x, ok in zip(ratio.tolist(), valid.tolist())],
+        dtype=float,
+    )
 
 
-def detect_new_assets(df, start_date, end_date):
-    """
-    Identify assets present on end_date that were not present on start_date.
+def _iso_dates(dates):
+    """Format datetimes as YYYY-MM-DD strings, formatting each distinct date once."""
+    codes, uniques = pd.factorize(dates, use_na_sentinel=False)
+    return pd.DatetimeIndex(uniques).strftime("%Y-%m-%d").to_numpy()[codes]
 
-    Returns a DataFrame with columns:
-        Date, Name, Identifier, Par Value, Market Value, Last Price, Asset Type
-    """
-    df_start = df[df["date"] == start_date].copy()
-    df_end = df[df["date"] == end_date].copy()
 
-    df_start["_key"] = df_start.apply(composite_key, axis=1)
-    df_end["_key"] = df_end.apply(composite_key, axis=1)
+def _split_by_boundary(df, start_date, end_date):
+    """Return the (start_date, end_date) slices of a date-indexed df."""
+    return df.loc[[start_date]].reset_index(), df.loc[[end_date]].reset_index()
 
-    start_keys = set(df_start["_key"])
-    new_mask = ~df_end["_key"].isin(start_keys)
-    new = df_end[new_mask].copy()
 
-    if new.empty:
+def _asset_rows(rows):
+    """Format boundary-date rows as the new/removed assets output table."""
+    if rows.empty:
         return pd.DataFrame(
             columns=["Date", "Name", "Identifier", "Par Value",
                       "Market Value", "Last Price", "Asset Type"]
         )
 
-    new["last_price"] = new.apply(
-        lambda r: round(r["market_value"] / r["par_value"] * 100, 4)
-        if pd.notna(r["par_value"]) and r["par_value"] != 0
-        else None,
-        axis=1,
-    )
-    out = new[["date", "name", "identifier", "par_value", "market_value",
-               "last_price", "asset_breakdown"]].copy()
+    rows = rows.copy()
+    rows["last_price"] = _compute_last_price(rows)
+    out = rows[["date", "name", "identifier", "par_value", "market_value",
+                "last_price", "asset_breakdown"]].copy()
     out.columns = ["Date", "Name", "Identifier", "Par Value",
                    "Market Value", "Last Price", "Asset Type"]
-    out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
+    out["Date"] = _iso_dates(out["Date"])
     out = out.sort_values("Name").reset_index(drop=True)
     return out
 
 
-def detect_removed_assets(df, start_date, end_date):
+def _detect_asset_delta(df_start, df_end):
     """
-    Identify assets present on start_date that are no longer present on end_date.
+    Compare the holdings on the two boundary dates.
 
-    Returns a DataFrame with columns:
+    Returns (new_assets, removed_assets): assets present on the end date
+    but not the start date, and vice versa. Both DataFrames have columns:
         Date, Name, Identifier, Par Value, Market Value, Last Price, Asset Type
     """
-    df_start = df[df["date"] == start_date].copy()
-    df_end = df[df["date"] == end_date].copy()
-
-    df_start["_key"] = df_start.apply(composite_key, axis=1)
-    df_end["_key"] = df_end.apply(composite_key, axis=1)
-
-    end_keys = set(df_end["_key"])
-    removed_mask = ~df_start["_key"].isin(end_keys)
-    removed = df_start[removed_mask].copy()
-
-    if removed.empty:
-        return pd.DataFrame(
-            columns=["Date", "Name", "Identifier", "Par Value",
-                      "Market Value", "Last Price", "Asset Type"]
-        )
-
-    removed["last_price"] = removed.apply(
-        lambda r: round(r["market_value"] / r["par_value"] * 100, 4)
-        if pd.notna(r["par_value"]) and r["par_value"] != 0
-        else None,
-        axis=1,
-    )
-    out = removed[["date", "name", "identifier", "par_value", "market_value",
-                    "last_price", "asset_breakdown"]].copy()
-    out.columns = ["Date", "Name", "Identifier", "Par Value",
-                   "Market Value", "Last Price", "Asset Type"]
-    out["Date"] = out["Date"].dt.strftime("%Y-%m-%d")
-    out = out.sort_values("Name").reset_index(drop=True)
-    return out
+    start_keys = df_start["_key"].to_numpy()
+    end_keys = df_end["_key"].to_numpy()
+    new = df_end[~df_end["_key"].isin(start_keys)]
+    removed = df_start[~df_start["_key"].isin(end_keys)]
+    return _asset_rows(new), _asset_rows(removed)
 
 
 def map_par_value_changes(df, available_dates, start_date, end_date):
@@ -189,61 +322,47 @@ def map_par_value_changes(df, available_dates, start_date, end_date):
                       "Par Value (Current)", "Par Change", "Asset Type"]
         )
 
-    df_range = df[df["date"].isin(dates_in_range)].copy()
-    df_range["_key"] = df_range.apply(composite_key, axis=1)
+    df_range = df.loc[dates_in_range[0]:dates_in_range[-1]].reset_index()
     df_range = df_range.sort_values(["_key", "date"])
 
-    changes = []
-    for key, group in df_range.groupby("_key"):
-        if len(group) < 2:
-            continue
-        par_vals = group["par_value"].values
-        diffs = pd.Series(par_vals).diff()
-
-        for i in range(1, len(group)):
-            diff = diffs.iloc[i]
-            rounded_diff = round(diff, 2) if pd.notna(diff) else 0
-            if rounded_diff != 0:
-                row = group.iloc[i]
-                prev_row = group.iloc[i - 1]
-                changes.append(
-                    {
-                        "Date": row["date"],
-                        "Name": row["name"],
-                        "Identifier": row["identifier"],
-                        "Par Value (Previous)": prev_row["par_value"],
-                        "Par Value (Current)": row["par_value"],
-                        "Par Change": rounded_diff,
-                        "Asset Type": row["asset_breakdown"],
-                    }
-                )
-
-    if not changes:
+    prev_par = df_range.groupby("_key")["par_value"].shift(1)
+    par_change = np.round(df_range["par_value"] - prev_par, 2)
+    mask = par_change.notna() & (par_change != 0)
+
+    if not mask.any():
         return pd.DataFrame(
             columns=["Date", "Name", "Identifier", "Par Value (Previous)",
                       "Par Value (Current)", "Par Change", "Asset Type"]
         )
 
-    out = pd.DataFrame(changes)
-    out["Date"] = pd.to_datetime(out["Date"]).dt.strftime("%Y-%m-%d")
+    changed = df_range[mask]
+    out = pd.DataFrame(
+        {
+            "Date": changed["date"].to_numpy(),
+            "Name": changed["name"].to_numpy(),
+            "Identifier": changed["identifier"].to_numpy(),
+            "Par Value (Previous)": prev_par[mask].to_numpy(),
+            "Par Value (Current)": changed["par_value"].to_numpy(),
+            "Par Change": par_change[mask].to_numpy(),
+            "Asset Type": changed["asset_breakdown"].to_numpy(),
+        }
+    )
+    out["Date"] = _iso_dates(out["Date"])
     out = out.sort_values(["Date", "Name"], ascending=[False, True]).reset_index(
         drop=True
     )
     return out
 
 
-def build_fund_report(db_path, fund_symbol, start_date, end_date):
+def build_fund_report(db_path, fund_symbol, start_date, end_date, conn=None):
     """
     Build the full report for a single fund between the given dates.
 
     Returns a dict with keys:
         summary, new_assets, removed_assets, par_changes
     """
-    df = load_fund_data(db_path, fund_symbol)
-    if df.empty:
-        return {"error": f"No data available for {fund_symbol}"}
-
-    available = get_available_dates(db_path, fund_symbol)
+    df = load_fund_data(db_path, fund_symbol, start_date, end_date, conn)
+    available = list(df.index.unique()) if not df.empty else []
     resolved_start, resolved_end = resolve_boundary_dates(
         available, start_date, end_date
     )
@@ -264,12 +383,10 @@ def build_fund_report(db_path, fund_symbol, start_date, end_date):
             )
         }
 
-    new_assets = detect_new_assets(df, resolved_start, resolved_end)
-    removed_assets = detect_removed_assets(df, resolved_start, resolved_end)
+    df_start, df_end = _split_by_boundary(df, resolved_start, resolved_end)
+    new_assets, removed_assets = _detect_asset_delta(df_start, df_end)
     par_changes = map_par_value_changes(df, available, resolved_start, resolved_end)
 
-    df_end = df[df["date"] == resolved_end]
-
     summary = {
         "fund": fund_symbol,
         "start_date": resolved_start.strftime("%Y-%m-%d"),
@@ -300,8 +417,14 @@ def generate_report(db_path, funds, start_date, end_date):
     Returns a dict keyed by fund symbol, each containing that fund's report.
     """
     results = {}
-    for fund in funds:
-        results[fund] = build_fund_report(db_path, fund, start_date, end_date)
+    conn = _open_ro(db_path)
+    try:
+        for fund in funds:
+            results[fund] = build_fund_report(
+                db_path, fund, start_date, end_date, conn
+            )
+    finally:
+        conn.close()
     return results
 
 
@@ -310,11 +433,22 @@ def generate_report(db_path, funds, start_date, end_date):
 # ---------------------------------------------------------------------------
 
 
-def _add_fund_column(df, fund):
-    """Return a copy of df with a Fund column inserted at position 0."""
-    out = df.copy()
-    out.insert(0, "Fund", fund)
-    return out
+CSV_SECTIONS = ["new_assets", "removed_assets", "par_changes"]
+
+
+def _csv_rows(df, fund=None):
+    """Yield df's rows as csv.writer rows, blank for missing values, optionally led by fund."""
+    prefix = [fund] if fund is not None else []
+    for row in df.itertuples(index=False, name=None):
+        yield prefix + ["" if pd.isna(v) else v for v in row]
+
+
+def _write_csv(path, header, rows):
+    """Write a header and rows to path, laid out the way DataFrame.to_csv does."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(header)
+        writer.writerows(rows)
 
 
 def export_csv(reports, output_dir):
@@ -330,10 +464,8 @@ def export_csv(reports, output_dir):
     """
     files = []
 
-    # Collect frames across funds for the combined files
-    all_new = []
-    all_removed = []
-    all_par = []
+    # Collect (fund, frame) pairs across funds for the combined files
+    combined = {section: [] for section in CSV_SECTIONS}
 
     for fund, report in reports.items():
         if "error" in report:
@@ -343,23 +475,14 @@ def export_csv(reports, output_dir):
         tag = f"{fund}_{s['start_date']}_to_{s['end_date']}"
 
         # Per-fund section CSVs
-        if not report["new_assets"].empty:
-            path = os.path.join(output_dir, f"new_assets_{tag}.csv")
-            report["new_assets"].to_csv(path, index=False)
-            files.append(path)
-            all_new.append(_add_fund_column(report["new_assets"], fund))
-
-        if not report["removed_assets"].empty:
-            path = os.path.join(output_dir, f"removed_assets_{tag}.csv")
-            report["removed_assets"].to_csv(path, index=False)
-            files.append(path)
-            all_removed.append(_add_fund_column(report["removed_assets"], fund))
-
-        if not report["par_changes"].empty:
-            path = os.path.join(output_dir, f"par_changes_{tag}.csv")
-            report["par_changes"].to_csv(path, index=False)
+        for section in CSV_SECTIONS:
+            frame = report[section]
+            if frame.empty:
+                continue
+            path = os.path.join(output_dir, f"{section}_{tag}.csv")
+            _write_csv(path, frame.columns, _csv_rows(frame))
             files.append(path)
-            all_par.append(_add_fund_column(report["par_changes"], fund))
+            combined[section].append((fund, frame))
 
     # Determine date tag from any successful report
     any_report = next(
@@ -371,28 +494,54 @@ def export_csv(reports, output_dir):
     s = any_report["summary"]
     date_tag = f"{s['start_date']}_to_{s['end_date']}"
 
-    # Combined new assets (all funds)
-    if all_new:
-        combined = pd.concat(all_new, ignore_index=True)
-        path = os.path.join(output_dir, f"new_assets_{date_tag}.csv")
-        combined.to_csv(path, index=False)
+    # Combined section CSVs (all funds), streamed fund by fund
+    for section, parts in combined.items():
+        if not parts:
+            continue
+        path = os.path.join(output_dir, f"{section}_{date_tag}.csv")
+        header = ["Fund", *parts[0][1].columns]
+        rows = (row for fund, frame in parts for row in _csv_rows(frame, fund))
+        _write_csv(path, header, rows)
         files.append(path)
 
-    # Combined removed assets (all funds)
-    if all_removed:
-        combined = pd.concat(all_removed, ignore_index=True)
-        path = os.path.join(output_dir, f"removed_assets_{date_tag}.csv")
-        combined.to_csv(path, index=False)
-        files.append(path)
+    return files
 
-    # Combined par value changes (all funds)
-    if all_par:
-        combined = pd.concat(all_par, ignore_index=True)
-        path = os.path.join(output_dir, f"par_changes_{date_tag}.csv")
-        combined.to_csv(path, index=False)
-        files.append(path)
 
-    return files
+def _html_change_cell(val):
+    """Render a numeric change as a signed, coloured <td>."""
+    css = "positive" if val > 0 else "negative" if val < 0 else ""
+    sign = "+" if val > 0 else ""
+    return f'  <td class="{css}">{sign}{val:,.2f}</td>\n'
+
+
+def _html_float_cell(val):
+    """Render a float as a <td> with 4 decimal places."""
+    return f"  <td>{val:,.4f}</td>\n"
+
+
+def _html_text_cell(val):
+    """Render any other value as a plain <td>."""
+    return f"  <td>{val}</td>\n"
+
+
+def _html_cell(col, val):
+    """Render one table value as a <td>, signed and coloured for Change columns."""
+    if "Change" in col and isinstance(val, (int, float)):
+        return _html_change_cell(val)
+    if isinstance(val, float):
+        return _html_float_cell(val)
+    return _html_text_cell(val)
+
+
+def _html_formatter(col, series):
+    """Pick a column's <td> formatter once from its name and dtype."""
+    kind = series.dtype.kind
+    if kind in "iuf":
+        if "Change" in col:
+            return _html_change_cell
+        return _html_float_cell if kind == "f" else _html_text_cell
+    # Object columns can mix types, so they still decide per value
+    return lambda val: _html_cell(col, val)
 
 
 def _html_table(df):
@@ -400,27 +549,23 @@ def _html_table(df):
     if df.empty:
         return '<div class="no-data">No data for this section</div>'
 
-    html = "<table>\n<thead>\n<tr>\n"
+    parts = ["<table>\n<thead>\n<tr>\n"]
+    for col in df.columns:
+        parts.append(f"  <th>{col}</th>\n")
+    parts.append("</tr>\n</thead>\n<tbody>\n")
+
+    # Format column by column, then stitch the cells back into rows
+    columns = []
     for col in df.columns:
-        html += f"  <th>{col}</th>\n"
-    html += "</tr>\n</thead>\n<tbody>\n"
-
-    for _, row in df.iterrows():
-        html += "<tr>\n"
-        for col in df.columns:
-            val = row[col]
-            if "Change" in col and isinstance(val, (int, float)):
-                css = "positive" if val > 0 else "negative" if val < 0 else ""
-                sign = "+" if val > 0 else ""
-                html += f'  <td class="{css}">{sign}{val:,.2f}</td>\n'
-            elif isinstance(val, float):
-                html += f"  <td>{val:,.4f}</td>\n"
-            else:
-                html += f"  <td>{val}</td>\n"
-        html += "</tr>\n"
-
-    html += "</tbody>\n</table>\n"
-    return html
+        fmt = _html_formatter(col, df[col])
+        columns.append([fmt(val) for val in df[col].tolist()])
+    for cells in zip(*columns):
+        parts.append("<tr>\n")
+        parts.extend(cells)
+        parts.append("</tr>\n")
+
+    parts.append("</tbody>\n</table>\n")
+    return "".join(parts)
 
 
 def export_html(reports, output_dir):
@@ -434,7 +579,7 @@ def export_html(reports, output_dir):
     s = any_report["summary"]
     funds_label = " / ".join(reports.keys())
 
-    html = f"""<!DOCTYPE html>
+    parts = [f"""<!DOCTYPE html>
 <html>
 <head>
 <meta charset="UTF-8">
@@ -472,15 +617,15 @@ tr:hover {{ background: #f8f9fa; }}
 <body>
 <h1>{funds_label} Weekly Asset Export Report</h1>
 <p><strong>Period:</strong> {s['start_date']} to {s['end_date']}</p>
-"""
+"""]
 
     for fund, report in reports.items():
         if "error" in report:
-            html += f"<h2>{fund}</h2>\n<p>{report['error']}</p>\n"
+            parts.append(f"<h2>{fund}</h2>\n<p>{report['error']}</p>\n")
             continue
 
         fs = report["summary"]
-        html += f"""
+        parts.append(f"""
 <h2>{fund}</h2>
 <div class="summary">
 <div class="summary-grid">
@@ -492,17 +637,17 @@ tr:hover {{ background: #f8f9fa; }}
   <div class="summary-item"><div class="summary-label">Par Changes</div><div class="summary-value">{fs['par_changes_count']}</div></div>
 </div>
 </div>
-"""
-        html += f"<h3>{fund} - New Assets</h3>\n"
-        html += _html_table(report["new_assets"])
+""")
+        parts.append(f"<h3>{fund} - New Assets</h3>\n")
+        parts.append(_html_table(report["new_assets"]))
 
-        html += f"<h3>{fund} - Removed Assets</h3>\n"
-        html += _html_table(report["removed_assets"])
+        parts.append(f"<h3>{fund} - Removed Assets</h3>\n")
+        parts.append(_html_table(report["removed_assets"]))
 
-        html += f"<h3>{fund} - Par Value Changes</h3>\n"
-        html += _html_table(report["par_changes"])
+        parts.append(f"<h3>{fund} - Par Value Changes</h3>\n")
+        parts.append(_html_table(report["par_changes"]))
 
-    html += """
+    parts.append("""
 <div class="footer">
 <strong>Disclosure:</strong> All information displayed here is public and is not in any way to be
 construed as investment advice or solicitation. Data is sourced from public filings and we make no
@@ -510,14 +655,14 @@ claims to veracity or accuracy of the data. It is presented for academic and res
 </div>
 </body>
 </html>
-"""
+""")
 
     out_path = os.path.join(
         output_dir,
         f"weekly_asset_report_{s['start_date']}_to_{s['end_date']}.html",
     )
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write(html)
+        f.write("".join(parts))
     return [out_path]
 
 
@@ -532,45 +677,45 @@ def export_markdown(reports, output_dir):
     s = any_report["summary"]
     funds_label = " / ".join(reports.keys())
 
-    md = f"# {funds_label} Weekly Asset Export Report\n\n"
-    md += f"**Period:** {s['start_date']} to {s['end_date']}\n\n---\n\n"
+    parts = [f"# {funds_label} Weekly Asset Export Report\n\n"]
+    parts.append(f"**Period:** {s['start_date']} to {s['end_date']}\n\n---\n\n")
 
     for fund, report in reports.items():
         if "error" in report:
-            md += f"## {fund}\n\n{report['error']}\n\n"
+            parts.append(f"## {fund}\n\n{report['error']}\n\n")
             continue
 
         fs = report["summary"]
-        md += f"## {fund}\n\n"
-        md += "| Metric | Value |\n|--------|-------|\n"
-        md += f"| Total Market Value | ${fs['total_market_value']:,.2f} |\n"
-        md += f"| Total Par Value | ${fs['total_par_value']:,.2f} |\n"
-        md += f"| Securities Count | {fs['securities_count']} |\n"
-        md += f"| New Assets | {fs['new_assets_count']} |\n"
-        md += f"| Removed Assets | {fs['removed_assets_count']} |\n"
-        md += f"| Par Value Changes | {fs['par_changes_count']} |\n\n"
-
-        md += f"### {fund} - New Assets\n\n"
+        parts.append(f"## {fund}\n\n")
+        parts.append("| Metric | Value |\n|--------|-------|\n")
+        parts.append(f"| Total Market Value | ${fs['total_market_value']:,.2f} |\n")
+        parts.append(f"| Total Par Value | ${fs['total_par_value']:,.2f} |\n")
+        parts.append(f"| Securities Count | {fs['securities_count']} |\n")
+        parts.append(f"| New Assets | {fs['new_assets_count']} |\n")
+        parts.append(f"| Removed Assets | {fs['removed_assets_count']} |\n")
+        parts.append(f"| Par Value Changes | {fs['par_changes_count']} |\n\n")
+
+        parts.append(f"### {fund} - New Assets\n\n")
         if not report["new_assets"].empty:
-            md += report["new_assets"].to_markdown(index=False) + "\n\n"
+            parts.append(report["new_assets"].to_markdown(index=False) + "\n\n")
         else:
-            md += "*No new assets*\n\n"
+            parts.append("*No new assets*\n\n")
 
-        md += f"### {fund} - Removed Assets\n\n"
+        parts.append(f"### {fund} - Removed Assets\n\n")
         if not report["removed_assets"].empty:
-            md += report["removed_assets"].to_markdown(index=False) + "\n\n"
+            parts.append(report["removed_assets"].to_markdown(index=False) + "\n\n")
         else:
-            md += "*No removed assets*\n\n"
+            parts.append("*No removed assets*\n\n")
 
-        md += f"### {fund} - Par Value Changes\n\n"
+        parts.append(f"### {fund} - Par Value Changes\n\n")
         if not report["par_changes"].empty:
-            md += report["par_changes"].to_markdown(index=False) + "\n\n"
+            parts.append(report["par_changes"].to_markdown(index=False) + "\n\n")
         else:
-            md += "*No par value changes*\n\n"
+            parts.append("*No par value changes*\n\n")
 
-        md += "---\n\n"
+        parts.append("---\n\n")
 
-    md += (
+    parts.append(
         "**Disclosure:** All information displayed here is public and is not in any "
         "way to be construed as investment advice or solicitation. Data is sourced from "
         "public filings and we make no claims to veracity or accuracy of the data. "
@@ -582,10 +727,38 @@ def export_markdown(reports, output_dir):
         f"weekly_asset_report_{s['start_date']}_to_{s['end_date']}.md",
     )
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write(md)
+        f.write("".join(parts))
     return [out_path]
 
 
+SUBSTACK_ASSET_FIELDS = [
+    ("Date:        {}\n", "Date"),
+    ("Name:        {}\n", "Name"),
+    ("Identifier:  {}\n", "Identifier"),
+    ("Par Value:   ${:,.2f}\n", "Par Value"),
+    ("Last Price:  {:.4f}\n", "Last Price"),
+    ("Asset Type:  {}\n", "Asset Type"),
+]
+
+# "Par Change" is pre-formatted with its sign ahead of the $ by export_substack
+SUBSTACK_PAR_CHANGE_FIELDS = [
+    ("Date:            {}\n", "Date"),
+    ("Name:            {}\n", "Name"),
+    ("Identifier:      {}\n", "Identifier"),
+    ("Previous Par:    ${:,.2f}\n", "Par Value (Previous)"),
+    ("Current Par:     ${:,.2f}\n", "Par Value (Current)"),
+    ("Par Change:      {}\n", "Par Change"),
+    ("Asset Type:      {}\n", "Asset Type"),
+]
+
+
+def _substack_entries(df, fields):
+    """Render each row of df as a Substack entry from (format, column) fields."""
+    columns = [[fmt.format(v) for v in df[col].tolist()] for fmt, col in fields]
+    divider = f"{'-'*70}\n"
+    return ["".join(lines) + divider for lines in zip(*columns)]
+
+
 def export_substack(reports, output_dir):
     """Export as plain text optimized for Substack copy/paste."""
     any_report = next(
@@ -597,73 +770,56 @@ def export_substack(reports, output_dir):
     s = any_report["summary"]
     funds_label = " / ".join(reports.keys())
 
-    txt = f"{'='*70}\n"
-    txt += f"{funds_label} WEEKLY ASSET EXPORT REPORT\n"
-    txt += f"{'='*70}\n\n"
-    txt += f"Period: {s['start_date']} to {s['end_date']}\n\n"
+    parts = [f"{'='*70}\n"]
+    parts.append(f"{funds_label} WEEKLY ASSET EXPORT REPORT\n")
+    parts.append(f"{'='*70}\n\n")
+    parts.append(f"Period: {s['start_date']} to {s['end_date']}\n\n")
 
     for fund, report in reports.items():
         if "error" in report:
-            txt += f"{fund}: {report['error']}\n\n"
+            parts.append(f"{fund}: {report['error']}\n\n")
             continue
 
         fs = report["summary"]
-        txt += f"{'='*70}\n"
-        txt += f"{fund} SUMMARY\n"
-        txt += f"{'='*70}\n"
-        txt += f"Total Market Value:    ${fs['total_market_value']:>20,.2f}\n"
-        txt += f"Total Par Value:       ${fs['total_par_value']:>20,.2f}\n"
-        txt += f"Securities Count:      {fs['securities_count']:>20}\n"
-        txt += f"New Assets:            {fs['new_assets_count']:>20}\n"
-        txt += f"Removed Assets:        {fs['removed_assets_count']:>20}\n"
-        txt += f"Par Value Changes:     {fs['par_changes_count']:>20}\n\n"
-
-        txt += f"{'─'*70}\n{fund} - NEW ASSETS\n{'─'*70}\n\n"
+        parts.append(f"{'='*70}\n")
+        parts.append(f"{fund} SUMMARY\n")
+        parts.append(f"{'='*70}\n")
+        parts.append(f"Total Market Value:    ${fs['total_market_value']:>20,.2f}\n")
+        parts.append(f"Total Par Value:       ${fs['total_par_value']:>20,.2f}\n")
+        parts.append(f"Securities Count:      {fs['securities_count']:>20}\n")
+        parts.append(f"New Assets:            {fs['new_assets_count']:>20}\n")
+        parts.append(f"Removed Assets:        {fs['removed_assets_count']:>20}\n")
+        parts.append(f"Par Value Changes:     {fs['par_changes_count']:>20}\n\n")
+
+        parts.append(f"{'─'*70}\n{fund} - NEW ASSETS\n{'─'*70}\n\n")
         if not report["new_assets"].empty:
-            for _, row in report["new_assets"].iterrows():
-                txt += f"Date:        {row['Date']}\n"
-                txt += f"Name:        {row['Name']}\n"
-                txt += f"Identifier:  {row['Identifier']}\n"
-                txt += f"Par Value:   ${row['Par Value']:,.2f}\n"
-                txt += f"Last Price:  {row['Last Price']:.4f}\n"
-                txt += f"Asset Type:  {row['Asset Type']}\n"
-                txt += f"{'-'*70}\n"
+            parts.extend(_substack_entries(report["new_assets"], SUBSTACK_ASSET_FIELDS))
         else:
-            txt += "(none)\n"
-        txt += "\n"
+            parts.append("(none)\n")
+        parts.append("\n")
 
-        txt += f"{'─'*70}\n{fund} - REMOVED ASSETS\n{'─'*70}\n\n"
+        parts.append(f"{'─'*70}\n{fund} - REMOVED ASSETS\n{'─'*70}\n\n")
         if not report["removed_assets"].empty:
-            for _, row in report["removed_assets"].iterrows():
-                txt += f"Date:        {row['Date']}\n"
-                txt += f"Name:        {row['Name']}\n"
-                txt += f"Identifier:  {row['Identifier']}\n"
-                txt += f"Par Value:   ${row['Par Value']:,.2f}\n"
-                txt += f"Last Price:  {row['Last Price']:.4f}\n"
-                txt += f"Asset Type:  {row['Asset Type']}\n"
-                txt += f"{'-'*70}\n"
+            parts.extend(_substack_entries(report["removed_assets"], SUBSTACK_ASSET_FIELDS))
         else:
-            txt += "(none)\n"
-        txt += "\n"
+            parts.append("(none)\n")
+        parts.append("\n")
 
-        txt += f"{'─'*70}\n{fund} - PAR VALUE CHANGES\n{'─'*70}\n\n"
+        parts.append(f"{'─'*70}\n{fund} - PAR VALUE CHANGES\n{'─'*70}\n\n")
         if not report["par_changes"].empty:
-            for _, row in report["par_changes"].iterrows():
-                sign = "+" if row["Par Change"] > 0 else ""
-                txt += f"Date:            {row['Date']}\n"
-                txt += f"Name:            {row['Name']}\n"
-                txt += f"Identifier:      {row['Identifier']}\n"
-                txt += f"Previous Par:    ${row['Par Value (Previous)']:,.2f}\n"
-                txt += f"Current Par:     ${row['Par Value (Current)']:,.2f}\n"
-                txt += f"Par Change:      {sign}${row['Par Change']:,.2f}\n"
-                txt += f"Asset Type:      {row['Asset Type']}\n"
-                txt += f"{'-'*70}\n"
+            changes = report["par_changes"].assign(**{
+                "Par Change": [
+                    f"{'+' if v > 0 else ''}${v:,.2f}"
+                    for v in report["par_changes"]["Par Change"].tolist()
+                ]
+            })
+            parts.extend(_substack_entries(changes, SUBSTACK_PAR_CHANGE_FIELDS))
         else:
-            txt += "(none)\n"
-        txt += "\n"
+            parts.append("(none)\n")
+        parts.append("\n")
 
-    txt += f"{'='*70}\nDISCLOSURE\n{'='*70}\n"
-    txt += (
+    parts.append(f"{'='*70}\nDISCLOSURE\n{'='*70}\n")
+    parts.append(
         "All information displayed here is public and is not in any way to be\n"
         "construed as investment advice or solicitation. Data is sourced from\n"
         "public filings and we make no claims to veracity or accuracy of the\n"
@@ -675,7 +831,7 @@ def export_substack(reports, output_dir):
         f"weekly_asset_report_{s['start_date']}_to_{s['end_date']}_substack.txt",
     )
     with open(out_path, "w", encoding="utf-8") as f:
-        f.write(txt)
+        f.write("".join(parts))
     return [out_path]
 
 
@@ -769,6 +925,7 @@ def main():
     if not os.path.exists(db_path):
         print(f"Error: Database not found at {db_path}", file=sys.stderr)
         return 1
+    ensure_report_index(db_path)
 
     # Ensure output directory exists
     os.makedirs(args.output_dir, exist_ok=True)
@@ -5,12 +5,24 @@ Generates a weekly report from priv_data.db showing changes over the last week.
 Export formats: CSV, HTML (for Substack), and Markdown
 """
 
+import csv
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import argparse
 import sys
 import os
+from pathlib import Path
+
+# Read-side tuning for the report's queries. The report connection is opened
+# read-only; the one-time index migration in ensure_report_index is the only write.
+SQLITE_READ_PRAGMAS = [
+    "query_only=1",
+    "cache_size=-65536",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",
+]
 
 
 def find_database(default_name="priv_data.db"):
@@ -55,32 +67,87 @@ def find_database(default_name="priv_data.db"):
     return os.path.abspath(default_name)
 
 
-def load_data(db_path, fund_symbol):
-    """Load data for a specific fund from the database."""
-    conn = sqlite3.connect(db_path)
+def ensure_report_index(db_path):
+    """Create the (source_identifier, date) index the report queries rely on."""
     try:
-        df = pd.read_sql(
-            "SELECT * FROM financial_data WHERE source_identifier = ?",
-            conn,
-            params=(fund_symbol,)
-        )
-        df["date"] = pd.to_datetime(df["date"])
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_financial_data_source_date "
+                "ON financial_data (source_identifier, date)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Warning: could not create report index: {e}", file=sys.stderr)
+
+
+def _open_ro(db_path):
+    """Open a read-only SQLite connection tuned with SQLITE_READ_PRAGMAS."""
+    conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    for pragma in SQLITE_READ_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma}")
+    return conn
+
+
+def _parse_dates(values):
+    """Parse date strings to datetimes, parsing each distinct string once."""
+    codes, uniques = pd.factorize(values)
+    return pd.to_datetime(uniques).take(codes)
+
+
+def _latest_date_strings(raw_dates, count):
+    """Return the stored date strings that fall on the `count` most recent dates."""
+    days = _parse_dates(pd.Series(raw_dates, dtype=object)).date
+    keep = set(sorted(set(days), reverse=True)[:count])
+    return [raw for raw, day in zip(raw_dates, days) if day in keep]
+
+
+def load_data(db_path, fund_symbol, days_back=None):
+    """
+    Load data for a specific fund from the database.
+
+    With days_back set, only the most recent days_back + 1 dates are read,
+    which is all generate_weekly_report compares. Dates are stored as M/D/YYYY
+    text, so the latest dates are picked in Python rather than by ORDER BY.
+    """
+    conn = None
+    try:
+        conn = _open_ro(db_path)
+        query = "SELECT * FROM financial_data WHERE source_identifier = ?"
+        params = [fund_symbol]
+        if days_back is not None and days_back >= 0:
+            raw_dates = [row[0] for row in conn.execute(
+                "SELECT DISTINCT date FROM financial_data WHERE source_identifier = ?",
+                (fund_symbol,)
+            )]
+            dates = _latest_date_strings(raw_dates, days_back + 1)
+            query += f" AND date IN ({','.join('?' * len(dates))})"
+            params.extend(dates)
+        df = pd.read_sql(query, conn, params=params)
+        df["date"] = _parse_dates(df["date"])
         return df
     except Exception as e:
         print(f"Error loading data for {fund_symbol}: {str(e)}", file=sys.stderr)
         return pd.DataFrame()
     finally:
-        conn.close()
+        if conn is not None:
+            conn.close()
 
 
-def create_composite_key(df):
-    """Create composite key for asset comparison."""
-    df = df.copy()
-    df['composite_key'] = df.apply(
-        lambda row: row['name'] if row['identifier'] == '-' else row['identifier'],
-        axis=1
-    )
-    return df.set_index('composite_key')
+def _composite_keys(df):
+    """Return each row's identifier, or its name where the identifier is '-'."""
+    identifier = df['identifier'].to_numpy()
+    return np.where(identifier == '-', df['name'].to_numpy(), identifier)
+
+
+def _last_price(df):
+    """Return market value over par value as a price per 100, rounded to 4 places."""
+    market_value = df["market_value"].to_numpy()
+    par_value = df["par_value"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.round(market_value / par_value * 100, 4)
 
 
 def generate_weekly_report(db_path, fund_symbol="PRIV", days_back=7):
@@ -95,14 +162,15 @@ def generate_weekly_report(db_path, fund_symbol="PRIV", days_back=7):
     Returns:
         Dictionary containing report data and dataframes
     """
-    # Load data
-    df = load_data(db_path, fund_symbol)
+    # Load only the dates the report compares
+    df = load_data(db_path, fund_symbol, days_back)
 
     if df.empty:
         return {"error": f"No data available for {fund_symbol}"}
 
-    # Get all available dates
-    available_dates = sorted(df["date"].dt.date.unique(), reverse=True)
+    # Get all available dates, newest first, as datetime64 days rather than boxed dates
+    days = df["date"].to_numpy().astype("datetime64[D]")
+    available_dates = np.unique(days)[::-1]
 
     if len(available_dates) < 2:
         return {"error": f"Insufficient data for {fund_symbol}. Need at least 2 dates."}
@@ -115,70 +183,48 @@ def generate_weekly_report(db_path, fund_symbol="PRIV", days_back=7):
     week_ago_date = available_dates[week_ago_idx]
 
     # Filter data for current and previous periods
-    df_current = df[df["date"].dt.date == most_recent_date].copy()
-    df_previous = df[df["date"].dt.date == week_ago_date].copy()
+    df_current = df[days == most_recent_date]
+    df_previous = df[days == week_ago_date]
 
-    # Calculate Last Price for current data
-    df_current["last_price"] = (df_current["market_value"] / df_current["par_value"] * 100).round(4)
-
-    # Create indexed dataframes for comparison
-    df_current_indexed = create_composite_key(df_current)
-    df_previous_indexed = create_composite_key(df_previous)
+    # Composite keys for comparison
+    current_keys = pd.Index(_composite_keys(df_current))
+    previous_keys = pd.Index(_composite_keys(df_previous))
 
     # Identify new assets
-    new_assets = df_current_indexed[~df_current_indexed.index.isin(df_previous_indexed.index)].copy()
+    new_assets = df_current[~current_keys.isin(previous_keys)]
 
     # Identify removed assets
-    removed_assets = df_previous_indexed[~df_previous_indexed.index.isin(df_current_indexed.index)].copy()
+    removed_assets = df_previous[~previous_keys.isin(current_keys)]
 
     # Identify par value changes across all dates in the range
-    # Get all dates between week_ago_date and most_recent_date
-    dates_in_range = [d for d in available_dates if week_ago_date <= d <= most_recent_date]
-    dates_in_range.sort()  # Sort chronologically
-
     # Track par value changes for each asset across all dates
-    par_changes_list = []
+    par_changes = pd.DataFrame(columns=['date', 'name', 'par_change', 'asset_breakdown'])
 
-    if len(dates_in_range) >= 2:
+    # The range holds at least two dates whenever its endpoints differ
+    if week_ago_date < most_recent_date:
         # Filter data for the entire date range
-        df_range = df[df["date"].dt.date.isin(dates_in_range)].copy()
+        df_range = df[(days >= week_ago_date) & (days <= most_recent_date)].copy()
 
         # Add composite key
-        df_range['composite_key'] = df_range.apply(
-            lambda row: row['name'] if row['identifier'] == '-' else row['identifier'],
-            axis=1
-        )
+        df_range['composite_key'] = _composite_keys(df_range)
 
         # Sort by composite_key and date
         df_range = df_range.sort_values(['composite_key', 'date'])
 
-        # For each asset, calculate par value changes between consecutive dates
-        for asset_key in df_range['composite_key'].unique():
-            asset_data = df_range[df_range['composite_key'] == asset_key].copy()
-
-            # Skip if asset only appears once in the range
-            if len(asset_data) < 2:
-                continue
-
-            # Calculate changes between consecutive dates
-            asset_data['par_change'] = asset_data['par_value'].diff()
+        # Change from each asset's previous date (NaN on its first row)
+        df_range['par_change'] = df_range.groupby('composite_key', sort=False)['par_value'].diff()
 
-            # Get rows where par value changed (skip first row which will be NaN)
-            changes = asset_data[asset_data['par_change'].notna() & (asset_data['par_change'] != 0)]
-
-            for _, row in changes.iterrows():
-                par_changes_list.append({
-                    'date': row['date'],
-                    'name': row['name'],
-                    'par_change': row['par_change'],
-                    'asset_breakdown': row['asset_breakdown']
-                })
+        # Keep rows where par value changed
+        changed = df_range['par_change'].notna() & (df_range['par_change'] != 0)
+        par_changes = df_range.loc[changed, ['date', 'name', 'par_change', 'asset_breakdown']]
+        par_changes = par_changes.reset_index(drop=True)
 
     # Prepare export dataframes with requested columns
 
     # New Assets: Date, Name, Last Price, Asset Type
     if not new_assets.empty:
-        new_assets_export = new_assets.reset_index()[["date", "name", "last_price", "asset_breakdown"]].copy()
+        new_assets_export = new_assets[["date", "name", "asset_breakdown"]].reset_index(drop=True)
+        new_assets_export.insert(2, "last_price", _last_price(new_assets))
         new_assets_export.columns = ["Date", "Name", "Last Price", "Asset Type"]
         new_assets_export["Date"] = pd.to_datetime(new_assets_export["Date"]).dt.strftime("%Y-%m-%d")
     else:
@@ -186,36 +232,41 @@ def generate_weekly_report(db_path, fund_symbol="PRIV", days_back=7):
 
     # Removed Assets: Date, Name, Last Price, Asset Type
     if not removed_assets.empty:
-        removed_assets["last_price"] = (removed_assets["market_value"] / removed_assets["par_value"] * 100).round(4)
-        removed_assets_export = removed_assets.reset_index()[["date", "name", "last_price", "asset_breakdown"]].copy()
+        removed_assets_export = removed_assets[["date", "name", "asset_breakdown"]].reset_index(drop=True)
+        removed_assets_export.insert(2, "last_price", _last_price(removed_assets))
         removed_assets_export.columns = ["Date", "Name", "Last Price", "Asset Type"]
         removed_assets_export["Date"] = pd.to_datetime(removed_assets_export["Date"]).dt.strftime("%Y-%m-%d")
     else:
         removed_assets_export = pd.DataFrame(columns=["Date", "Name", "Last Price", "Asset Type"])
 
     # Par Value Changes: Date, Name, Par Change, Asset Type
-    if par_changes_list:
-        par_changes_export = pd.DataFrame(par_changes_list)
-        par_changes_export.columns = ["Date", "Name", "Par Change", "Asset Type"]
-        par_changes_export["Date"] = pd.to_datetime(par_changes_export["Date"]).dt.strftime("%Y-%m-%d")
+    if not par_changes.empty:
+        par_changes_export = par_changes.set_axis(["Date", "Name", "Par Change", "Asset Type"], axis=1)
         par_changes_export["Par Change"] = par_changes_export["Par Change"].round(2)
-        # Sort by date (most recent first) then by name
-        par_changes_export = par_changes_export.sort_values(['Date', 'Name'], ascending=[False, True])
+        # Sort by date (most recent first) then by name, on datetime64 values and
+        # sorted name codes rather than formatted strings
+        dates = par_changes_export["Date"].to_numpy().astype("datetime64[D]").view("i8")
+        name_codes, names = pd.factorize(par_changes_export["Name"], sort=True)
+        name_codes[name_codes == -1] = len(names)  # missing names last
+        par_changes_export = par_changes_export.iloc[np.lexsort((name_codes, -dates))]
+        par_changes_export["Date"] = pd.to_datetime(par_changes_export["Date"]).dt.strftime("%Y-%m-%d")
     else:
         par_changes_export = pd.DataFrame(columns=["Date", "Name", "Par Change", "Asset Type"])
 
     # Summary statistics
+    report_date = pd.Timestamp(most_recent_date)
+    comparison_date = pd.Timestamp(week_ago_date)
     summary = {
         "fund": fund_symbol,
-        "report_date": most_recent_date.strftime("%Y-%m-%d"),
-        "comparison_date": week_ago_date.strftime("%Y-%m-%d"),
-        "days_back": (most_recent_date - week_ago_date).days,
+        "report_date": report_date.strftime("%Y-%m-%d"),
+        "comparison_date": comparison_date.strftime("%Y-%m-%d"),
+        "days_back": (report_date - comparison_date).days,
         "total_market_value": df_current["market_value"].sum(),
         "total_par_value": df_current["par_value"].sum(),
         "securities_count": len(df_current),
         "new_assets_count": len(new_assets),
         "removed_assets_count": len(removed_assets),
-        "par_changes_count": len(par_changes_list)
+        "par_changes_count": len(par_changes)
     }
 
     return {
@@ -226,6 +277,19 @@ def generate_weekly_report(db_path, fund_symbol="PRIV", days_back=7):
     }
 
 
+def _csv_rows(df):
+    """Return df's header and rows as csv.writer rows, blank for missing values."""
+    values = df.to_numpy(dtype=object)
+    values[df.isna().to_numpy()] = ""
+    return [list(df.columns)] + values.tolist()
+
+
+def _write_csv(path, df):
+    """Write df to path, laid out the way DataFrame.to_csv(index=False) does."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f, lineterminator=os.linesep).writerows(_csv_rows(df))
+
+
 def export_to_csv(report_data, output_prefix="weekly_report"):
     """Export report data to CSV files."""
     fund = report_data["summary"]["fund"]
@@ -236,24 +300,28 @@ def export_to_csv(report_data, output_prefix="weekly_report"):
     # Export new assets
     if not report_data["new_assets"].empty:
         filename = f"{output_prefix}_{fund}_new_assets_{report_date}.csv"
-        report_data["new_assets"].to_csv(filename, index=False)
+        _write_csv(filename, report_data["new_assets"])
         files_created.append(filename)
 
     # Export removed assets
     if not report_data["removed_assets"].empty:
         filename = f"{output_prefix}_{fund}_removed_assets_{report_date}.csv"
-        report_data["removed_assets"].to_csv(filename, index=False)
+        _write_csv(filename, report_data["removed_assets"])
         files_created.append(filename)
 
     # Export par changes
     if not report_data["par_changes"].empty:
         filename = f"{output_prefix}_{fund}_par_changes_{report_date}.csv"
-        report_data["par_changes"].to_csv(filename, index=False)
+        _write_csv(filename, report_data["par_changes"])
         files_created.append(filename)
 
     # Export combined report
     combined_filename = f"{output_prefix}_{fund}_combined_{report_date}.csv"
     with open(combined_filename, 'w') as f:
+        # One writer for all three tables; the text handle turns its "\n"
+        # line endings into os.linesep like the comment lines around them
+        writer = csv.writer(f, lineterminator="\n")
+
         f.write(f"# Weekly Report for {fund}\n")
         f.write(f"# Report Date: {report_date}\n")
         f.write(f"# Comparison Date: {report_data['summary']['comparison_date']}\n")
@@ -269,121 +337,169 @@ def export_to_csv(report_data, output_prefix="weekly_report"):
 
         if not report_data["new_assets"].empty:
             f.write("# NEW ASSETS\n")
-            report_data["new_assets"].to_csv(f, index=False)
+            writer.writerows(_csv_rows(report_data["new_assets"]))
             f.write("\n")
 
         if not report_data["removed_assets"].empty:
             f.write("# REMOVED ASSETS\n")
-            report_data["removed_assets"].to_csv(f, index=False)
+            writer.writerows(_csv_rows(report_data["removed_assets"]))
             f.write("\n")
 
         if not report_data["par_changes"].empty:
             f.write("# PAR VALUE CHANGES\n")
-            report_data["par_changes"].to_csv(f, index=False)
+            writer.writerows(_csv_rows(report_data["par_changes"]))
             f.write("\n")
 
     files_created.append(combined_filename)
     return files_created
 
 
-def export_to_html(report_data, output_file="weekly_report.html"):
-    """Export report data to HTML format suitable for Substack."""
-    summary = report_data["summary"]
-
-    html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Weekly Report - {summary['fund']}</title>
-    <style>
-        body {{
+# Stylesheet shared by every HTML report; a plain string, so no brace escaping
+HTML_STYLE = """    <style>
+        body {
             font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, "Helvetica Neue", Arial, sans-serif;
             max-width: 900px;
             margin: 40px auto;
             padding: 0 20px;
             color: #333;
             line-height: 1.6;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #2c3e50;
             border-bottom: 3px solid #3498db;
             padding-bottom: 10px;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #34495e;
             margin-top: 30px;
             border-bottom: 2px solid #ecf0f1;
             padding-bottom: 8px;
-        }}
-        .summary {{
+        }
+        .summary {
             background-color: #f8f9fa;
             border-left: 4px solid #3498db;
             padding: 15px 20px;
             margin: 20px 0;
-        }}
-        .summary-grid {{
+        }
+        .summary-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 15px;
             margin-top: 15px;
-        }}
-        .summary-item {{
+        }
+        .summary-item {
             padding: 10px;
             background: white;
             border-radius: 5px;
-        }}
-        .summary-label {{
+        }
+        .summary-label {
             font-size: 0.85em;
             color: #7f8c8d;
             margin-bottom: 5px;
-        }}
-        .summary-value {{
+        }
+        .summary-value {
             font-size: 1.3em;
             font-weight: bold;
             color: #2c3e50;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
             background: white;
             box-shadow: 0 1px 3px rgba(0,0,0,0.12);
-        }}
-        th {{
+        }
+        th {
             background-color: #3498db;
             color: white;
             padding: 12px;
             text-align: left;
             font-weight: 600;
-        }}
-        td {{
+        }
+        td {
             padding: 10px 12px;
             border-bottom: 1px solid #ecf0f1;
-        }}
-        tr:hover {{
+        }
+        tr:hover {
             background-color: #f8f9fa;
-        }}
-        .no-data {{
+        }
+        .no-data {
             color: #95a5a6;
             font-style: italic;
             padding: 20px;
             text-align: center;
-        }}
-        .positive {{
+        }
+        .positive {
             color: #27ae60;
-        }}
-        .negative {{
+        }
+        .negative {
             color: #e74c3c;
-        }}
-        .footer {{
+        }
+        .footer {
             margin-top: 40px;
             padding-top: 20px;
             border-top: 1px solid #ecf0f1;
             font-size: 0.9em;
             color: #7f8c8d;
-        }}
+        }
     </style>
-</head>
+"""
+
+
+def _html_price_cell(value):
+    """Render a price as a <td> with 4 decimal places."""
+    return f"                <td>{value:.4f}</td>\n"
+
+
+def _html_change_cell(value):
+    """Render a par change as a signed, coloured <td>."""
+    css_class = "positive" if value > 0 else "negative" if value < 0 else ""
+    sign = "+" if value > 0 else ""
+    return f'                <td class="{css_class}">{sign}{value:,.2f}</td>\n'
+
+
+def _html_text_cell(value):
+    """Render any other value as a plain <td>."""
+    return f"                <td>{value}</td>\n"
+
+
+HTML_CELL_FORMATTERS = {
+    "Last Price": _html_price_cell,
+    "Par Change": _html_change_cell,
+}
+
+
+def _html_table(df):
+    """Render a report table as HTML, formatting one column at a time."""
+    parts = ["    <table>\n", "        <thead>\n            <tr>\n"]
+    for col in df.columns:
+        parts.append(f"                <th>{col}</th>\n")
+    parts.append("            </tr>\n        </thead>\n        <tbody>\n")
+
+    # Format column by column, then stitch the cells back into rows
+    columns = []
+    for col in df.columns:
+        fmt = HTML_CELL_FORMATTERS.get(col, _html_text_cell)
+        columns.append([fmt(value) for value in df[col].tolist()])
+    for cells in zip(*columns):
+        parts.append("            <tr>\n")
+        parts.extend(cells)
+        parts.append("            </tr>\n")
+
+    parts.append("        </tbody>\n    </table>\n")
+    return "".join(parts)
+
+
+def export_to_html(report_data, output_file="weekly_report.html"):
+    """Export report data to HTML format suitable for Substack."""
+    summary = report_data["summary"]
+
+    parts = [f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>Weekly Report - {summary['fund']}</title>
+""", HTML_STYLE, f"""</head>
 <body>
     <h1>📊 {summary['fund']} Weekly Report</h1>
 
@@ -417,81 +533,31 @@ def export_to_html(report_data, output_file="weekly_report.html"):
             </div>
         </div>
     </div>
-"""
+"""]
 
     # New Assets Section
-    html += "\n    <h2>➕ New Assets</h2>\n"
+    parts.append("\n    <h2>➕ New Assets</h2>\n")
     if not report_data["new_assets"].empty:
-        html += "    <table>\n"
-        html += "        <thead>\n            <tr>\n"
-        for col in report_data["new_assets"].columns:
-            html += f"                <th>{col}</th>\n"
-        html += "            </tr>\n        </thead>\n        <tbody>\n"
-
-        for _, row in report_data["new_assets"].iterrows():
-            html += "            <tr>\n"
-            for col in report_data["new_assets"].columns:
-                value = row[col]
-                if col == "Last Price":
-                    html += f"                <td>{value:.4f}</td>\n"
-                else:
-                    html += f"                <td>{value}</td>\n"
-            html += "            </tr>\n"
-
-        html += "        </tbody>\n    </table>\n"
+        parts.append(_html_table(report_data["new_assets"]))
     else:
-        html += '    <div class="no-data">No new assets this week</div>\n'
+        parts.append('    <div class="no-data">No new assets this week</div>\n')
 
     # Removed Assets Section
-    html += "\n    <h2>➖ Removed Assets</h2>\n"
+    parts.append("\n    <h2>➖ Removed Assets</h2>\n")
     if not report_data["removed_assets"].empty:
-        html += "    <table>\n"
-        html += "        <thead>\n            <tr>\n"
-        for col in report_data["removed_assets"].columns:
-            html += f"                <th>{col}</th>\n"
-        html += "            </tr>\n        </thead>\n        <tbody>\n"
-
-        for _, row in report_data["removed_assets"].iterrows():
-            html += "            <tr>\n"
-            for col in report_data["removed_assets"].columns:
-                value = row[col]
-                if col == "Last Price":
-                    html += f"                <td>{value:.4f}</td>\n"
-                else:
-                    html += f"                <td>{value}</td>\n"
-            html += "            </tr>\n"
-
-        html += "        </tbody>\n    </table>\n"
+        parts.append(_html_table(report_data["removed_assets"]))
     else:
-        html += '    <div class="no-data">No removed assets this week</div>\n'
+        parts.append('    <div class="no-data">No removed assets this week</div>\n')
 
     # Par Value Changes Section
-    html += "\n    <h2>🔁 Par Value Changes</h2>\n"
+    parts.append("\n    <h2>🔁 Par Value Changes</h2>\n")
     if not report_data["par_changes"].empty:
-        html += "    <table>\n"
-        html += "        <thead>\n            <tr>\n"
-        for col in report_data["par_changes"].columns:
-            html += f"                <th>{col}</th>\n"
-        html += "            </tr>\n        </thead>\n        <tbody>\n"
-
-        for _, row in report_data["par_changes"].iterrows():
-            html += "            <tr>\n"
-            for col in report_data["par_changes"].columns:
-                value = row[col]
-                if col == "Par Change":
-                    css_class = "positive" if value > 0 else "negative" if value < 0 else ""
-                    sign = "+" if value > 0 else ""
-                    html += f'                <td class="{css_class}">{sign}{value:,.2f}</td>\n'
-                else:
-                    html += f"                <td>{value}</td>\n"
-            html += "            </tr>\n"
-
-        html += "        </tbody>\n    </table>\n"
+        parts.append(_html_table(report_data["par_changes"]))
     else:
-        html += '    <div class="no-data">No par value changes this week</div>\n'
+        parts.append('    <div class="no-data">No par value changes this week</div>\n')
 
     # Footer
-    html += """
+    parts.append("""
     <div class="footer">
         <strong>Disclosure:</strong> All information displayed here is public and is not in any way to be construed as investment advice or solicitation.
         Data is sourced from public filings and we make no claims to veracity or accuracy of the data.
@@ -499,10 +565,10 @@ def export_to_html(report_data, output_file="weekly_report.html"):
     </div>
 </body>
 </html>
-"""
+""")
 
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+        f.write("".join(parts))
 
     return output_file
 
@@ -535,11 +601,11 @@ Par Value Changes:     {summary['par_changes_count']:>20}
     text += f"{'='*70}\n\n"
 
     if not report_data["new_assets"].empty:
-        for _, row in report_data["new_assets"].iterrows():
-            text += f"Date:        {row['Date']}\n"
-            text += f"Name:        {row['Name']}\n"
-            text += f"Last Price:  {row['Last Price']:.4f}\n"
-            text += f"Asset Type:  {row['Asset Type']}\n"
+        for date, name, last_price, asset_type in report_data["new_assets"].itertuples(index=False, name=None):
+            text += f"Date:        {date}\n"
+            text += f"Name:        {name}\n"
+            text += f"Last Price:  {last_price:.4f}\n"
+            text += f"Asset Type:  {asset_type}\n"
             text += f"{'-'*70}\n"
     else:
         text += "No new assets this week\n\n"
@@ -550,11 +616,11 @@ Par Value Changes:     {summary['par_changes_count']:>20}
     text += f"{'='*70}\n\n"
 
     if not report_data["removed_assets"].empty:
-        for _, row in report_data["removed_assets"].iterrows():
-            text += f"Date:        {row['Date']}\n"
-            text += f"Name:        {row['Name']}\n"
-            text += f"Last Price:  {row['Last Price']:.4f}\n"
-            text += f"Asset Type:  {row['Asset Type']}\n"
+        for date, name, last_price, asset_type in report_data["removed_assets"].itertuples(index=False, name=None):
+            text += f"Date:        {date}\n"
+            text += f"Name:        {name}\n"
+            text += f"Last Price:  {last_price:.4f}\n"
+            text += f"Asset Type:  {asset_type}\n"
             text += f"{'-'*70}\n"
     else:
         text += "No removed assets this week\n\n"
@@ -565,12 +631,12 @@ Par Value Changes:     {summary['par_changes_count']:>20}
     text += f"{'='*70}\n\n"
 
     if not report_data["par_changes"].empty:
-        for _, row in report_data["par_changes"].iterrows():
-            change_sign = "+" if row['Par Change'] > 0 else ""
-            text += f"Date:        {row['Date']}\n"
-            text += f"Name:        {row['Name']}\n"
-            text += f"Par Change:  {change_sign}${row['Par Change']:,.2f}\n"
-            text += f"Asset Type:  {row['Asset Type']}\n"
+        for date, name, par_change, asset_type in report_data["par_changes"].itertuples(index=False, name=None):
+            change_sign = "+" if par_change > 0 else ""
+            text += f"Date:        {date}\n"
+            text += f"Name:        {name}\n"
+            text += f"Par Change:  {change_sign}${par_change:,.2f}\n"
+            text += f"Asset Type:  {asset_type}\n"
             text += f"{'-'*70}\n"
     else:
         text += "No par value changes this week\n\n"
@@ -592,11 +658,45 @@ data. It is presented for academic and research purposes only.
     return output_file
 
 
+def _markdown_change(value):
+    """Format a par change with an explicit sign for gains."""
+    sign = "+" if value > 0 else ""
+    return f"{sign}{value:,.2f}"
+
+
+MARKDOWN_CELL_FORMATTERS = {
+    "Last Price": "{:.4f}".format,
+    "Par Change": _markdown_change,
+}
+
+
+def _markdown_text(value):
+    """Format any other value, escaping pipes so they don't split the cell."""
+    return str(value).replace("|", "\\|")
+
+
+def _markdown_table(df):
+    """Render a report table as a Markdown pipe table, numbers right-aligned."""
+    header = "| " + " | ".join(df.columns) + " |"
+    separator = "|" + "|".join(
+        "---:" if df[col].dtype.kind in "iuf" else "---" for col in df.columns
+    ) + "|"
+
+    # Format column by column, then stitch the cells back into rows
+    columns = []
+    for col in df.columns:
+        fmt = MARKDOWN_CELL_FORMATTERS.get(col, _markdown_text)
+        columns.append([fmt(value) for value in df[col].tolist()])
+    rows = ["| " + " | ".join(cells) + " |" for cells in zip(*columns)]
+
+    return "\n".join([header, separator] + rows)
+
+
 def export_to_markdown(report_data, output_file="weekly_report.md"):
     """Export report data to Markdown format suitable for Substack."""
     summary = report_data["summary"]
 
-    md = f"""# 📊 {summary['fund']} Weekly Report
+    parts = [f"""# 📊 {summary['fund']} Weekly Report
 
 **Report Period:** {summary['comparison_date']} to {summary['report_date']} ({summary['days_back']} days)
 
@@ -613,42 +713,42 @@ def export_to_markdown(report_data, output_file="weekly_report.md"):
 
 ---
 
-"""
+"""]
 
     # New Assets Section
-    md += "## ➕ New Assets\n\n"
+    parts.append("## ➕ New Assets\n\n")
     if not report_data["new_assets"].empty:
-        md += report_data["new_assets"].to_markdown(index=False)
-        md += "\n\n"
+        parts.append(_markdown_table(report_data["new_assets"]))
+        parts.append("\n\n")
     else:
-        md += "*No new assets this week*\n\n"
+        parts.append("*No new assets this week*\n\n")
 
     # Removed Assets Section
-    md += "## ➖ Removed Assets\n\n"
+    parts.append("## ➖ Removed Assets\n\n")
     if not report_data["removed_assets"].empty:
-        md += report_data["removed_assets"].to_markdown(index=False)
-        md += "\n\n"
+        parts.append(_markdown_table(report_data["removed_assets"]))
+        parts.append("\n\n")
     else:
-        md += "*No removed assets this week*\n\n"
+        parts.append("*No removed assets this week*\n\n")
 
     # Par Value Changes Section
-    md += "## 🔁 Par Value Changes\n\n"
+    parts.append("## 🔁 Par Value Changes\n\n")
     if not report_data["par_changes"].empty:
-        md += report_data["par_changes"].to_markdown(index=False)
-        md += "\n\n"
+        parts.append(_markdown_table(report_data["par_changes"]))
+        parts.append("\n\n")
     else:
-        md += "*No par value changes this week*\n\n"
+        parts.append("*No par value changes this week*\n\n")
 
     # Footer
-    md += """---
+    parts.append("""---
 
 **Disclosure:** All information displayed here is public and is not in any way to be construed as investment advice or solicitation.
 Data is sourced from public filings and we make no claims to veracity or accuracy of the data.
 It is presented for academic and research purposes only.
-"""
+""")
 
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(md)
+        f.write("".join(parts))
 
     return output_file
 
@@ -699,6 +799,7 @@ def main():
 
     # Generate report
     print(f"Using database: {db_path}")
+    ensure_report_index(db_path)
     print(f"Generating weekly report for {args.fund}...")
     print(f"Looking back {args.days} trading days...")
 